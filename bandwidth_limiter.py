@@ -0,0 +1,50 @@
+import threading
+import time
+
+class BandwidthLimiter:
+    """Token bucket shared by every stream transfer in the process.
+
+    Transfers call consume() for each chunk they receive. Chunks are admitted in
+    the order they were requested, so parallel transfers reading similar chunk
+    sizes get an even share of the rate. set_rate() takes effect immediately,
+    including for transfers already waiting.
+    """
+
+    def __init__(self, rate: float = 0, burst_seconds: float = 0.5):
+        self.rate = max(0.0, rate)  # bytes per second, 0 = unlimited
+        self.burst_seconds = burst_seconds
+        self._reserved = 0.0  # bytes requested so far
+        self._allowance = 0.0  # bytes the rate has allowed so far
+        self._last = time.monotonic()
+        self._condition = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate > 0:
+            # Idle time only banks a short burst, not unlimited credit
+            burst = self.rate * self.burst_seconds
+            self._allowance = min(self._allowance + (now - self._last) * self.rate, self._reserved + burst)
+        else:
+            self._allowance = self._reserved
+        self._last = now
+
+    def set_rate(self, rate: float):
+        """Change the limit in bytes per second; 0 removes it"""
+        with self._condition:
+            self._refill()
+            self.rate = max(0.0, rate)
+            self._condition.notify_all()
+
+    def consume(self, byte_count: int):
+        """Block until byte_count more bytes fit within the rate"""
+        if self.rate <= 0:
+            return
+        with self._condition:
+            self._refill()
+            self._reserved += byte_count
+            position = self._reserved
+            while True:
+                self._refill()
+                if self.rate <= 0 or self._allowance >= position:
+                    return
+                self._condition.wait((position - self._allowance) / self.rate)
\ No newline at end of file
@@ -1,74 +1,314 @@
 # playlist_downloader.py
-from pytubefix import Playlist, Channel
+import threading
+from itertools import islice
+from typing import Callable, Iterable, TYPE_CHECKING
 from pathlib import Path
 from config import FileType
 from video_downloader import VideoDownloader
+from merge_pipeline import MergePipeline
+from retry_scheduler import RetryScheduler, is_retryable
+from file_manager import FileManager
+from download_plan import DownloadPlan
 from ui_handler import UIHandler
 
+if TYPE_CHECKING:
+    from pytubefix import Playlist
+
 class BatchDownloader:
-    def __init__(self):
+    def __init__(self, max_workers: int = 1, merge_workers: int = 0, merge_queue_depth: int = 2):
         self.video_downloader = VideoDownloader()
+        self.max_workers = max(1, max_workers)
+        # merge_workers == 0 keeps merging inline with each download
+        self.merge_workers = merge_workers
+        self.merge_queue_depth = merge_queue_depth
+        # Re-queues videos that failed for transient reasons
+        self.retry_scheduler = RetryScheduler()
+        # Videos downloaded and videos that still failed after retries, across every batch in this run
+        self.succeeded_downloads = 0
+        self.failed_downloads = 0
+        # Stop each playlist or channel listing after this many videos (0 = all)
+        self.max_items = 0
+        # Video IDs already taken on in this run; channel playlists mostly repeat its uploads
+        self._claimed_ids: set[str] = set()
+        # Claimed videos that then failed for good; later occurrences try them again
+        self._failed_ids: set[str] = set()
+        self._claim_lock = threading.Lock()
+
+    def _claim(self, video_id: str | None) -> bool:
+        """Claim a video for this run, returning False if another listing already took it"""
+        if video_id is None:
+            return True
+        with self._claim_lock:
+            if video_id in self._claimed_ids:
+                return False
+            self._claimed_ids.add(video_id)
+            return True
+
+    def _settle(self, video_id: str | None, succeeded: bool):
+        """Record how a claimed video finally went, releasing the claim if it failed"""
+        if video_id is None:
+            return
+        with self._claim_lock:
+            if succeeded:
+                self._failed_ids.discard(video_id)
+            else:
+                self._claimed_ids.discard(video_id)
+                self._failed_ids.add(video_id)
+
+    def _listing(self, video_urls: Iterable, total: dict) -> Iterable:
+        """Yield URLs from a lazy listing, honouring max_items, and fill in total once the end is reached"""
+        count = 0
+        try:
+            for count, url in enumerate(islice(video_urls, self.max_items or None), 1):
+                yield url
+        except Exception as e:
+            UIHandler.print_error(f"Stopped listing videos after {count}: {str(e)}")
+        total['count'] = count
+        UIHandler.print_info(f"Listing complete: {count} videos")
+
+    def _download_videos(self, video_urls: Iterable, file_type: FileType, target_extension: str,
+                         resolution: str, dir_path: Path, newest_first: bool = False,
+                         playlist_title: str | None = None,
+                         on_result: Callable[[str, bool, bool], None] | None = None) -> tuple[int, int]:
+        """Download videos on max_workers workers as the listing yields them, retrying transient failures.
+
+        Each video is downloaded at most once per run. newest_first listings stop being read at the
+        first video older than the published_after cutoff. With a playlist_title, an M3U playlist of
+        the listing's files is written at the end. Items may also be plan entries, which are
+        downloaded from their stored stream URLs. on_result(url, succeeded, too_old) is called
+        once per item, after its last attempt.
+        """
+        total = {'count': len(video_urls) if isinstance(video_urls, list) else None}
+        skipped: set[int] = set()
+        # Listing position -> video ID of occurrences left to the listing that claimed the video
+        duplicates: dict[int, str] = {}
+        # Listing position -> video ID, for the playlist file
+        members: dict[int, str] = {}
+
+        def download(numbered_url, attempt: int) -> tuple[bool, BaseException | None]:
+            i, item = numbered_url
+            url = item['url'] if isinstance(item, dict) else item
+            video_id = VideoDownloader.get_video_id(url)
+            if video_id is not None:
+                members[i] = video_id
+            if attempt == 0 and not self._claim(video_id):
+                duplicates[i] = video_id
+                if on_result is not None:
+                    on_result(url, True, False)
+                return True, None
+            retry_note = f" (retry {attempt}/{self.retry_scheduler.max_retries})" if attempt else ""
+            print(f"\n[{i}/{total['count'] or '?'}] Processing video...{retry_note}")
+            if isinstance(item, dict):
+                succeeded = self.video_downloader.download_planned(item, dir_path)
+            else:
+                succeeded = self.video_downloader.download_single(url, file_type, target_extension, resolution, dir_path)
+            if self.video_downloader.last_was_too_old():
+                skipped.add(i)
+                if newest_first:
+                    self.retry_scheduler.stop_intake()
+            elif succeeded:
+                with self._claim_lock:
+                    self.succeeded_downloads += 1
+            error = None if succeeded else self.video_downloader.last_failure()
+            final = succeeded or i in skipped or attempt >= self.retry_scheduler.max_retries or not is_retryable(error)
+            if final and i not in skipped:
+                self._settle(video_id, succeeded)
+            if on_result is not None and final:
+                on_result(url, succeeded, i in skipped)
+            return succeeded, error
+
+        def on_retry(numbered_url, attempt: int, delay: float, error: BaseException):
+            i, _ = numbered_url
+            UIHandler.print_info(f"[{i}/{total['count'] or '?'}] Transient failure ({type(error).__name__}), "
+                                 f"retry {attempt} in {delay:.1f}s")
+
+        def on_merge_failure():
+            # The video was counted when its streams were handed over; without an output it failed after all
+            with self._claim_lock:
+                self.succeeded_downloads -= 1
+
+        if self.merge_workers > 0:
+            self.video_downloader.merge_pipeline = MergePipeline(self.merge_workers, self.merge_queue_depth,
+                                                                 on_merge_failure)
+
+        try:
+            if self.max_workers > 1:
+                UIHandler.print_info(f"Downloading with {self.max_workers} parallel workers")
+            listing = video_urls if isinstance(video_urls, list) else self._listing(video_urls, total)
+            results = self.retry_scheduler.run(enumerate(listing, 1), download, self.max_workers, on_retry)
+        finally:
+            failed_merges = 0
+            if self.video_downloader.merge_pipeline is not None:
+                UIHandler.print_info("Waiting for queued merges to finish...")
+                failed_merges = self.video_downloader.merge_pipeline.close()
+                self.video_downloader.merge_pipeline = None
+
+        # Videos whose merge failed downloaded fine but did not produce an output file
+        successful_downloads = sum(1 for result in results if result) - failed_merges - len(skipped) - len(duplicates)
+        if skipped:
+            UIHandler.print_info(f"Skipped {len(skipped)} videos published before {self.video_downloader.published_after}")
+        # Occurrences of a video whose claimed download failed for good are failures, not reuses
+        with self._claim_lock:
+            reused = [i for i, video_id in duplicates.items() if video_id not in self._failed_ids]
+        if reused:
+            UIHandler.print_info(f"Reused {len(reused)} videos already downloaded in this run")
+        if playlist_title is not None:
+            self._write_playlist(dir_path, playlist_title, [members[i] for i in sorted(members)])
+        failed_downloads = len(results) - len(skipped) - len(reused) - successful_downloads
+        self.failed_downloads += failed_downloads
+        return successful_downloads, failed_downloads
+
+    def _write_playlist(self, dir_path: Path, title: str, video_ids: list[str]):
+        """Write an M3U file pointing at the run's copy of each playlist video"""
+        outputs = self.video_downloader.outputs
+        entries = [outputs[video_id] for video_id in dict.fromkeys(video_ids) if video_id in outputs]
+        if not entries:
+            return
+        try:
+            playlist_path = FileManager.write_playlist(dir_path, title, entries)
+            UIHandler.print_info(f"Playlist file written: {playlist_path.name} ({len(entries)} videos)")
+        except OSError as e:
+            UIHandler.print_error(f"Couldn't write playlist file for '{title}': {str(e)}")
+
+    @staticmethod
+    def _print_summary(title: str, successful_downloads: int, failed_downloads: int):
+        """Print success and failure counts for a batch"""
+        UIHandler.print_section_header(title)
+        UIHandler.print_success(f"Successfully downloaded: {successful_downloads} videos")
+        if failed_downloads > 0:
+            UIHandler.print_error(f"Failed downloads: {failed_downloads} videos")
+
+    def download_videos(self, video_urls: list, file_type: FileType, target_extension: str,
+                        resolution: str, dir_path: Path):
+        """Download a list of individual video URLs as one batch"""
+        UIHandler.print_section_header(f"VIDEOS: {len(video_urls)} URLs")
+        successful_downloads, failed_downloads = self._download_videos(
+            video_urls, file_type, target_extension, resolution, dir_path
+        )
+        self._print_summary("BATCH DOWNLOAD SUMMARY", successful_downloads, failed_downloads)
+
+    def download_plan(self, plan: DownloadPlan, dir_path: Path):
+        """Download every video in a saved plan without resolving them again"""
+        UIHandler.print_section_header(f"PLAN: {len(plan.entries)} videos")
+        successful_downloads, failed_downloads = self._download_videos(
+            plan.entries, plan.file_type, plan.target_extension, plan.resolution, dir_path
+        )
+        self._print_summary("PLAN DOWNLOAD SUMMARY", successful_downloads, failed_downloads)
+
+    def plan(self, sources: list[tuple[str, str]], file_type: FileType, target_extension: str,
+             resolution: str) -> DownloadPlan:
+        """Resolve every video that (download type, URL) sources lead to and plan its download.
+
+        Videos are resolved on max_workers workers with the same retries, max_items and
+        published_after cutoff as a download, but no media is transferred. Videos the
+        manifest or media store already hold are listed as skipped instead of planned.
+        """
+        from pytubefix import Channel, Playlist
+        plan = DownloadPlan(file_type, target_extension, resolution)
+        # Listing position -> entry, so the plan keeps listing order whatever order videos resolve in
+        entries: dict[int, dict] = {}
+        errors: dict[int, str] = {}
+        skipped: dict[int, dict] = {}
+        listed: list[str] = []
+        # Channels list newest first, so their listing ends at the first video before the cutoff
+        finished_channels: set[str] = set()
+
+        def listing():
+            for download_type, url in sources:
+                if download_type == 'single':
+                    listed.append(url)
+                    yield len(listed), None, url
+                    continue
+                try:
+                    source = Playlist(url) if download_type == 'playlist' else Channel(url)
+                    for video_url in islice(source.url_generator(), self.max_items or None):
+                        if url in finished_channels:
+                            break
+                        listed.append(video_url)
+                        yield len(listed), url if download_type == 'channel' else None, video_url
+                except Exception as e:
+                    UIHandler.print_error(f"Couldn't list {url}: {str(e)}")
+                    plan.failures.append({'url': url, 'error': str(e)})
+
+        def resolve(item, attempt: int) -> tuple[bool, BaseException | None]:
+            i, channel_url, url = item
+            video_id = VideoDownloader.get_video_id(url)
+            if attempt == 0 and not self._claim(video_id):
+                return True, None
+            existing = self.video_downloader.existing_copy(video_id, file_type, target_extension, resolution)
+            if existing is not None:
+                skipped[i] = {'url': url, 'video_id': video_id, 'reason': f"already in the {existing}"}
+                print(f"[{i}] {video_id}: already downloaded ({existing}), skipped")
+                return True, None
+            entry = self.video_downloader.plan_single(url, file_type, target_extension, resolution)
+            if entry is not None:
+                entries[i] = entry
+                print(f"[{i}] {entry['title']}: {entry['mode']}, {(entry['bytes'] or 0) / (1024 * 1024):.1f} MB")
+                return True, None
+            if self.video_downloader.last_was_too_old():
+                if channel_url is not None:
+                    finished_channels.add(channel_url)
+                return True, None
+            error = self.video_downloader.last_failure()
+            errors[i] = str(error) if error is not None else "No suitable stream"
+            return False, error
+
+        if self.max_workers > 1:
+            UIHandler.print_info(f"Resolving with {self.max_workers} parallel workers")
+        self.retry_scheduler.run(listing(), resolve, self.max_workers)
+        plan.entries = [entries[i] for i in sorted(entries)]
+        plan.skipped = [skipped[i] for i in sorted(skipped)]
+        plan.failures += [{'url': listed[i - 1], 'error': errors[i]} for i in sorted(errors) if i not in entries]
+        return plan
 
     def download_playlist(self, playlist_url: str, file_type: FileType, target_extension: str, 
                          resolution: str, dir_path: Path):
         """Download all videos from a playlist"""
+        from pytubefix import Playlist
         try:
-            playlist = Playlist(playlist_url)
-            UIHandler.print_section_header(f"PLAYLIST: {playlist.title}")
-            UIHandler.print_info(f"Total videos: {len(playlist.video_urls)}")
-            
-            successful_downloads = 0
-            failed_downloads = 0
-            
-            for i, url in enumerate(playlist.video_urls, 1):
-                print(f"\n[{i}/{len(playlist.video_urls)}] Processing video...")
-                if self.video_downloader.download_single(url, file_type, target_extension, resolution, dir_path):
-                    successful_downloads += 1
-                else:
-                    failed_downloads += 1
-            
-            # Summary
-            UIHandler.print_section_header("PLAYLIST DOWNLOAD SUMMARY")
-            UIHandler.print_success(f"Successfully downloaded: {successful_downloads} videos")
-            if failed_downloads > 0:
-                UIHandler.print_error(f"Failed downloads: {failed_downloads} videos")
-                
+            self._download_playlist(Playlist(playlist_url), file_type, target_extension, resolution, dir_path)
         except Exception as e:
             UIHandler.print_error(f"Error processing playlist: {str(e)}")
 
+    def _download_playlist(self, playlist: 'Playlist', file_type: FileType, target_extension: str,
+                           resolution: str, dir_path: Path):
+        """Download all videos from an already constructed playlist"""
+        UIHandler.print_section_header(f"PLAYLIST: {playlist.title}")
+
+        # Start on the first page of results instead of paging through the whole playlist first
+        successful_downloads, failed_downloads = self._download_videos(
+            playlist.url_generator(), file_type, target_extension, resolution, dir_path,
+            playlist_title=playlist.title
+        )
+        
+        self._print_summary("PLAYLIST DOWNLOAD SUMMARY", successful_downloads, failed_downloads)
+
     def download_channel(self, url: str, file_type: FileType, target_extension: str, 
                         resolution: str, dir_path: Path):
         """Download all videos from a channel"""
+        from pytubefix import Channel, Playlist
         try:
             channel = Channel(url)
             UIHandler.print_section_header(f"CHANNEL: {channel.channel_name}")
             UIHandler.print_info(f"Subscriber count: {getattr(channel, 'subscriber_count', 'Unknown')}")
             
-            video_urls = list(channel.video_urls)
-            UIHandler.print_info(f"Total videos found: {len(video_urls)}")
-            
-            successful_downloads = 0
-            failed_downloads = 0
-            
-            for i, video_url in enumerate(video_urls, 1):
-                print(f"\n[{i}/{len(video_urls)}] Processing video...")
-                if self.video_downloader.download_single(video_url, file_type, target_extension, resolution, dir_path):
-                    successful_downloads += 1
-                else:
-                    failed_downloads += 1
+            # Uploads are listed newest first, page by page, so a --since cutoff ends the listing early
+            successful_downloads, failed_downloads = self._download_videos(
+                channel.url_generator(), file_type, target_extension, resolution, dir_path, newest_first=True
+            )
             
             # Process playlists from channel home
             UIHandler.print_info("Checking for channel playlists...")
             for item in channel.home:
                 if isinstance(item, Playlist):
                     UIHandler.print_info(f"Found playlist: {item.title}")
-                    self.download_playlist(item.playlist_url, file_type, target_extension, resolution, dir_path)
+                    # Reuse the playlist object the channel listing already built
+                    try:
+                        self._download_playlist(item, file_type, target_extension, resolution, dir_path)
+                    except Exception as e:
+                        UIHandler.print_error(f"Error processing playlist: {str(e)}")
             
-            # Summary
-            UIHandler.print_section_header("CHANNEL DOWNLOAD SUMMARY")
-            UIHandler.print_success(f"Successfully downloaded: {successful_downloads} videos")
-            if failed_downloads > 0:
-                UIHandler.print_error(f"Failed downloads: {failed_downloads} videos")
+            self._print_summary("CHANNEL DOWNLOAD SUMMARY", successful_downloads, failed_downloads)
                 
         except Exception as e:
             UIHandler.print_error(f"Error processing channel: {str(e)}")
\ No newline at end of file
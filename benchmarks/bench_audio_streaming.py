@@ -0,0 +1,61 @@
+"""Compare saving an audio stream then converting it with piping it straight into ffmpeg.
+
+Serves a real audio file from a local throttled server and converts it both ways.
+Needs ffmpeg and ffprobe on PATH. Run from the repository root:
+    python -m benchmarks.bench_audio_streaming --extension mp3 --bandwidth-mb 4
+    python -m benchmarks.bench_audio_streaming --source song.webm --extension ogg
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from ffmpeg import FFmpeg
+from benchmarks.fake_stream_server import FakeStreamServer
+from stream_fetcher import StreamFetcher
+from config import VALID_AUDIO_FILE_TYPES
+from transcoder import convert_file, encode_stream, ffmpeg_tools_available, probe_codecs
+
+def make_source(path: Path, seconds: int):
+    """Encode a test tone as AAC in an M4A container, like YouTube's audio-only streams"""
+    FFmpeg().option('y').input(f"sine=frequency=440:duration={seconds}", f='lavfi').output(
+        str(path), {'c:a': 'aac', 'b:a': '128k', 'movflags': '+faststart'}
+    ).execute()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', type=Path, help="Audio file to serve; a generated tone by default")
+    parser.add_argument('--seconds', type=int, default=600, help="Length of the generated tone")
+    parser.add_argument('--extension', choices=VALID_AUDIO_FILE_TYPES, default='mp3')
+    parser.add_argument('--bandwidth-mb', type=float, default=4.0, help="Server cap in MB/s")
+    args = parser.parse_args()
+    if not ffmpeg_tools_available():
+        sys.exit("This benchmark needs ffmpeg and ffprobe on PATH")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        source = args.source
+        if source is None:
+            source = temp_dir / "source.m4a"
+            make_source(source, args.seconds)
+        payload = source.read_bytes()
+        _, audio_codec = probe_codecs(source)
+
+        with FakeStreamServer(payload=payload, bandwidth=args.bandwidth_mb * 1024 * 1024) as server:
+            saved = temp_dir / f"saved{source.suffix}"
+            started = time.perf_counter()
+            StreamFetcher.fetch_resumable(server.url, saved, len(payload), "bench")
+            converted, _, _, _ = convert_file(str(saved), args.extension)
+            save_then_convert = time.perf_counter() - started
+            converted_size = Path(converted).stat().st_size
+            print(f"save + convert: {save_then_convert:6.2f}s  "
+                  f"{(len(payload) + converted_size) / (1024 * 1024):6.1f} MB written")
+
+            streamed = temp_dir / f"streamed.{args.extension}"
+            started = time.perf_counter()
+            encode_stream(StreamFetcher.iter_stream(server.url, len(payload)), audio_codec, streamed)
+            streaming = time.perf_counter() - started
+            print(f"streamed:       {streaming:6.2f}s  {streamed.stat().st_size / (1024 * 1024):6.1f} MB written")
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""Startup benchmark: how long importing each entry module takes, measured with -X importtime.
+
+Each module is imported in a fresh interpreter several times and the median
+cumulative time is reported. The run fails if importing an entry module pulls
+in a dependency that should only load on first use (pytubefix, ffmpeg, tqdm).
+Run from the repository root:
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --save startup.json
+    python -m benchmarks.bench_import_time --baseline startup.json --tolerance 0.25
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+MODULES = ('main', 'cli', 'daemon', 'video_downloader', 'batch_downloader', 'stream_handler', 'file_manager')
+# Heavy packages the entry modules must not import until a download needs them
+DEFERRED = ('pytubefix', 'ffmpeg', 'tqdm', 'aiohttp')
+
+def import_profile(module: str) -> tuple[float, set[str]]:
+    """Import module in a new interpreter and return its cumulative milliseconds and every module loaded"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    cumulative_us = 0
+    loaded = set()
+    for line in completed.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or line.rstrip().endswith('imported package'):
+            continue
+        _, cumulative, name = line.split('|')
+        loaded.add(name.strip())
+        if name.strip() == module:
+            cumulative_us = int(cumulative)
+    return cumulative_us / 1000, loaded
+
+def measure(module: str, repeat: int) -> dict:
+    """Median import time of module over repeat runs, and the deferred packages it loaded"""
+    timings = []
+    eager = set()
+    for _ in range(repeat):
+        milliseconds, loaded = import_profile(module)
+        timings.append(milliseconds)
+        eager |= {name for name in loaded if name.split('.')[0] in DEFERRED}
+    top_level = sorted({name.split('.')[0] for name in eager})
+    return {'module': module, 'milliseconds': statistics.median(timings), 'eager_imports': top_level}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modules', nargs='+', default=list(MODULES))
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh interpreters per module; the median is kept")
+    parser.add_argument('--save', type=Path, help="Write the results as JSON for a later --baseline")
+    parser.add_argument('--baseline', type=Path, help="Compare against saved results and fail on regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown before failing, 0.25 = 25%%")
+    args = parser.parse_args()
+
+    results = [measure(module, max(1, args.repeat)) for module in args.modules]
+    print(f"{'module':<20}{'import ms':>10}  eagerly loaded")
+    for result in results:
+        print(f"{result['module']:<20}{result['milliseconds']:>10.1f}  {', '.join(result['eager_imports']) or '-'}")
+
+    problems = [f"{result['module']} imports {', '.join(result['eager_imports'])} at load time"
+                for result in results if result['eager_imports']]
+    if args.save:
+        args.save.write_text(json.dumps({'results': results}, indent=2))
+    if args.baseline:
+        previous = {result['module']: result for result in json.loads(args.baseline.read_text())['results']}
+        for result in results:
+            before = previous.get(result['module'])
+            if before is not None and result['milliseconds'] > before['milliseconds'] * (1 + args.tolerance):
+                problems.append(f"{result['module']}: {before['milliseconds']:.1f}ms -> {result['milliseconds']:.1f}ms")
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    return 1 if problems else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""End-to-end benchmark of single, playlist and channel downloads against local fakes.
+
+Each scenario runs in a fresh process so peak RSS is its own. Videos come from
+benchmarks.fake_youtube, with streams served by a FakeStreamServer that adds
+latency, caps per-connection bandwidth and drops a share of requests.
+Run from the repository root:
+    python -m benchmarks.bench_pipeline --videos 20 --size-mb 8 --workers 4
+    python -m benchmarks.bench_pipeline --save baseline.json
+    python -m benchmarks.bench_pipeline --baseline baseline.json --tolerance 0.15
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCENARIOS = ('single', 'playlist', 'channel')
+
+def run_scenario(scenario: str, options: dict) -> dict:
+    """Run one scenario in this process and return its measurements"""
+    from benchmarks.fake_stream_server import FakeStreamServer
+    from benchmarks.fake_youtube import fake_video_url, patched_pytubefix
+    from batch_downloader import BatchDownloader
+    from config import FileType
+    from metadata_cache import MetadataCache
+    from metrics import Metrics
+    from retry_scheduler import RetryScheduler
+
+    size = int(options['size_mb'] * 1024 * 1024)
+    server = FakeStreamServer(size, latency=options['latency'],
+                              bandwidth=options['bandwidth_mb'] * 1024 * 1024 if options['bandwidth_mb'] else None,
+                              failure_rate=options['failure_rate'])
+    with server, tempfile.TemporaryDirectory() as temp_dir, \
+            patched_pytubefix(server, options['latency'], options['videos']):
+        dir_path = Path(temp_dir)
+        batch = BatchDownloader(options['workers'])
+        batch.retry_scheduler = RetryScheduler(max_retries=5, base_delay=0.1)
+        downloader = batch.video_downloader
+        downloader.metadata_cache = MetadataCache()
+        downloader.download_segments = options['segments']
+        file_type = FileType.AUDIO if options['audio'] else FileType.VIDEO
+        extension = 'm4a' if options['audio'] else 'mp4'
+        Metrics.configure(None)
+
+        started = time.perf_counter()
+        # The downloaders narrate every step; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            if scenario == 'single':
+                batch.download_videos([fake_video_url(0)], file_type, extension, '360p', dir_path)
+            elif scenario == 'playlist':
+                batch.download_playlist("https://www.youtube.com/playlist?list=fake", file_type, extension, '360p', dir_path)
+            else:
+                batch.download_channel("https://www.youtube.com/@fake", file_type, extension, '360p', dir_path)
+        elapsed = time.perf_counter() - started
+
+        downloaded = sum(file.stat().st_size for file in dir_path.rglob('*') if file.is_file())
+        summary = Metrics.summary()
+        return {
+            'scenario': scenario,
+            'seconds': elapsed,
+            'bytes': downloaded,
+            'mb_per_second': downloaded / elapsed / (1024 * 1024),
+            'videos_ok': summary['videos']['ok'],
+            # Includes attempts that later succeeded on retry
+            'videos_failed': summary['videos']['failed'],
+            'requests': server.requests,
+            'phases': {name: phase['total_seconds'] for name, phase in summary['phases'].items()},
+            # ru_maxrss is in kilobytes on Linux and bytes on macOS
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform != 'darwin' else 1024 * 1024),
+        }
+
+def print_results(results: list[dict]):
+    print(f"{'scenario':<10}{'time s':>8}{'MB/s':>8}{'ok':>5}{'fail':>5}{'reqs':>6}{'RSS MB':>8}  phase seconds")
+    for result in results:
+        phases = ', '.join(f"{name} {seconds:.2f}" for name, seconds in result['phases'].items())
+        print(f"{result['scenario']:<10}{result['seconds']:>8.2f}{result['mb_per_second']:>8.1f}"
+              f"{result['videos_ok']:>5}{result['videos_failed']:>5}{result['requests']:>6}"
+              f"{result['peak_rss_mb']:>8.1f}  {phases}")
+
+def find_regressions(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    """Scenarios that got slower or hungrier than the baseline by more than tolerance"""
+    previous = {result['scenario']: result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(result['scenario'])
+        if before is None:
+            continue
+        if result['seconds'] > before['seconds'] * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: {before['seconds']:.2f}s -> {result['seconds']:.2f}s")
+        if result['peak_rss_mb'] > before['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: peak RSS {before['peak_rss_mb']:.1f} -> {result['peak_rss_mb']:.1f} MB")
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--videos', type=int, default=20, help="Videos per playlist and channel")
+    parser.add_argument('--size-mb', type=float, default=4.0, help="Size of each video stream")
+    parser.add_argument('--latency', type=float, default=0.02, help="Seconds added to each request and page")
+    parser.add_argument('--bandwidth-mb', type=float, default=0.0, help="Per-connection cap in MB/s, 0 for none")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Share of requests dropped")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--segments', type=int, default=1)
+    parser.add_argument('--audio', action='store_true', help="Download audio-only streams instead of video")
+    parser.add_argument('--save', type=Path, help="Write the results as JSON for a later --baseline")
+    parser.add_argument('--baseline', type=Path, help="Compare against saved results and fail on regressions")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="Allowed slowdown before failing, 0.10 = 10%%")
+    args = parser.parse_args()
+
+    options = {key: getattr(args, key) for key in
+               ('videos', 'size_mb', 'latency', 'bandwidth_mb', 'failure_rate', 'workers', 'segments', 'audio')}
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for scenario in args.scenarios:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results.append(pool.submit(run_scenario, scenario, options).result())
+    print_results(results)
+
+    if args.save:
+        args.save.write_text(json.dumps({'options': options, 'results': results}, indent=2))
+    if args.baseline:
+        regressions = find_regressions(results, json.loads(args.baseline.read_text())['results'], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
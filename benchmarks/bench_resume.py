@@ -0,0 +1,139 @@
+"""Interrupt resumable downloads from a local range server, resume them in a new run folder and verify the files.
+
+Checks a single stream fetched through StreamFetcher and an adaptive video+audio
+download through VideoDownloader, whose streams transfer on their own threads.
+
+Run from the repository root:
+    python -m benchmarks.bench_resume --size-mb 32 --interrupt-at 0.6
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from benchmarks.fake_stream_server import FakeStreamServer
+from metrics import Metrics
+from stream_fetcher import StreamFetcher
+from video_downloader import VideoDownloader
+
+class Interrupted(Exception):
+    """Stands in for a crash or Ctrl+C part way through a transfer"""
+
+class CapturingMergePipeline:
+    """Takes the merge hand-off so the adaptive check needs no ffmpeg"""
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, title, video_path, audio_path, output_path, file_seconds, on_complete=None, codecs=(None, None)):
+        self.jobs.append((video_path, audio_path))
+
+def fake_stream(server: FakeStreamServer, itag: int, stream_type: str, size: int) -> SimpleNamespace:
+    """Just enough of a pytubefix Stream for VideoDownloader's direct fetch path"""
+    return SimpleNamespace(
+        url=server.url, filesize=size, itag=itag, subtype='mp4', is_sabr=False, resolution='2160p', abr='128kbps',
+        video_codec='avc1.640028' if stream_type == 'video' else None, audio_codec='mp4a.40.2',
+        get_file_path=lambda filename=None, output_path=None: str(Path(output_path) / filename),
+    )
+
+def check_single(server: FakeStreamServer, download_dir: Path, size: int, cutoff: int) -> bool:
+    """Interrupt StreamFetcher.fetch_resumable and finish it from a second run folder"""
+    part_path = download_dir / StreamFetcher.PARTIAL_DIR_NAME / "fake.18.part"
+    part_path.parent.mkdir(exist_ok=True)
+    received = {'bytes': 0}
+
+    def interrupting(byte_count: int):
+        received['bytes'] += byte_count
+        if received['bytes'] >= cutoff:
+            raise Interrupted()
+
+    first_run = download_dir / "single-1"
+    first_run.mkdir()
+    try:
+        StreamFetcher.fetch_resumable(server.url, first_run / "video.mp4", size, "18", interrupting, part_path=part_path)
+    except Interrupted:
+        pass
+    kept = StreamFetcher.resume_offset(part_path, size, "18")
+    print(f"Single stream: interrupted after {received['bytes'] / (1024 * 1024):.1f} MB, "
+          f"{kept / (1024 * 1024):.1f} MB kept for resuming")
+
+    # A later run writes into a fresh folder but finds the same partial file
+    second_run = download_dir / "single-2"
+    second_run.mkdir()
+    output_path = second_run / "video.mp4"
+    started = time.perf_counter()
+    StreamFetcher.fetch_resumable(server.url, output_path, size, "18", part_path=part_path)
+    elapsed = time.perf_counter() - started
+
+    identical = output_path.read_bytes() == server.payload
+    print(f"Single stream: resumed {(size - kept) / (1024 * 1024):.1f} MB in {elapsed:.2f}s, "
+          f"{'byte-identical' if identical else 'CORRUPT'}")
+    return identical and kept > 0 and not part_path.exists()
+
+def check_adaptive(server: FakeStreamServer, download_dir: Path, size: int, cutoff: int) -> bool:
+    """Interrupt the video half of an adaptive download and finish it from a second run folder"""
+    video_id = "fakeadaptiv"
+    yt = SimpleNamespace(title="Adaptive", length=300)
+
+    def downloader() -> VideoDownloader:
+        video_downloader = VideoDownloader()
+        video_downloader.resume_downloads = True
+        video_downloader.partial_dir = download_dir / StreamFetcher.PARTIAL_DIR_NAME
+        video_downloader.merge_pipeline = CapturingMergePipeline()
+        return video_downloader
+
+    def run(video_downloader: VideoDownloader, name: str, interrupt: bool) -> tuple[bool, int]:
+        """Download both streams, returning whether it succeeded and the video bytes that came off the network"""
+        video_stream, audio_stream = fake_stream(server, 401, 'video', size), fake_stream(server, 140, 'audio', size // 8)
+        network = {'bytes': 0}
+        advance = video_downloader._advance
+
+        def counting(stream, byte_count: int):
+            if stream is video_stream:
+                network['bytes'] += byte_count
+                if interrupt and network['bytes'] >= cutoff:
+                    raise Interrupted()
+            advance(stream, byte_count)
+
+        video_downloader._advance = counting
+        run_dir = download_dir / name
+        run_dir.mkdir()
+        with Metrics.bind(video_id):
+            succeeded = video_downloader._download_adaptive(yt, video_stream, audio_stream, 'mp4', run_dir)
+        return succeeded, network['bytes']
+
+    _, fetched = run(downloader(), "adaptive-1", interrupt=True)
+    part_path = download_dir / StreamFetcher.PARTIAL_DIR_NAME / f"{video_id}.401.part"
+    kept = StreamFetcher.resume_offset(part_path, size, "401")
+    print(f"Adaptive: interrupted after {fetched / (1024 * 1024):.1f} MB of video, {kept / (1024 * 1024):.1f} MB kept for resuming")
+
+    video_downloader = downloader()
+    succeeded, fetched = run(video_downloader, "adaptive-2", interrupt=False)
+    if not succeeded or not video_downloader.merge_pipeline.jobs:
+        print("Adaptive: resumed download failed")
+        return False
+    video_path, _ = video_downloader.merge_pipeline.jobs[0]
+    identical = video_path.read_bytes() == server.payload
+    print(f"Adaptive: resumed with {fetched / (1024 * 1024):.1f} MB of video transferred, "
+          f"{'byte-identical' if identical else 'CORRUPT'}")
+    return identical and kept > 0 and fetched == size - kept
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=32, help="Size of the synthetic stream")
+    parser.add_argument('--interrupt-at', type=float, default=0.6, help="Share of the stream fetched before the interruption")
+    parser.add_argument('--bandwidth-mb', type=float, default=None, help="Per-connection cap in MB/s")
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    cutoff = int(size * args.interrupt_at)
+    with FakeStreamServer(size, bandwidth=args.bandwidth_mb * 1024 * 1024 if args.bandwidth_mb else None) as server:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            download_dir = Path(temp_dir)
+            results = [check_single(server, download_dir, size, cutoff), check_adaptive(server, download_dir, size, cutoff)]
+    if not all(results):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""Compare single-connection and segmented stream fetches against a throttled local server.
+
+Run from the repository root:
+    python -m benchmarks.bench_segmented_fetch --size-mb 64 --bandwidth-mb 8 --segments 1 2 4 8
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.fake_stream_server import FakeStreamServer
+from stream_fetcher import StreamFetcher
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=64, help="Size of the synthetic stream")
+    parser.add_argument('--bandwidth-mb', type=float, default=8.0, help="Per-connection cap in MB/s")
+    parser.add_argument('--latency', type=float, default=0.02, help="Seconds added before each response")
+    parser.add_argument('--segments', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    with FakeStreamServer(size, latency=args.latency, bandwidth=args.bandwidth_mb * 1024 * 1024) as server:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for segments in args.segments:
+                output_path = Path(temp_dir) / f"stream_{segments}.mp4"
+                started = time.perf_counter()
+                StreamFetcher.fetch_segmented(server.url, output_path, size, segments)
+                elapsed = time.perf_counter() - started
+                assert output_path.read_bytes() == server.payload, "Segmented fetch produced a corrupt file"
+                print(f"{segments:>2} segment(s): {elapsed:6.2f}s  {size / elapsed / (1024 * 1024):7.1f} MB/s")
+                output_path.unlink()
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
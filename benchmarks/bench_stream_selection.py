@@ -0,0 +1,90 @@
+"""Micro-benchmark of stream selection over synthetic stream lists.
+
+Compares the old filter cascade on StreamQuery with the single-pass StreamIndex.
+Run from the repository root:
+    python -m benchmarks.bench_stream_selection --streams 40 200 1000 --repeat 200
+"""
+import argparse
+import contextlib
+import io
+import random
+import timeit
+from pytubefix.query import StreamQuery
+from stream_handler import StreamHandler
+
+RESOLUTIONS = ('144p', '240p', '360p', '480p', '720p', '1080p', '2160p')
+VIDEO_SUBTYPES = ('mp4', 'webm')
+AUDIO_BITRATES = ('48kbps', '50kbps', '70kbps', '128kbps', '160kbps')
+
+class FakeStream:
+    """Just the attributes StreamQuery and StreamIndex look at"""
+
+    def __init__(self, itag: int, stream_type: str, subtype: str, resolution: str | None = None,
+                 abr: str | None = None, progressive: bool = False):
+        self.itag = itag
+        self.type = stream_type
+        self.subtype = subtype
+        self.resolution = resolution
+        self.abr = abr
+        self.is_progressive = progressive
+        self.is_adaptive = not progressive
+        self.includes_audio_track = progressive or stream_type == 'audio'
+        self.includes_video_track = progressive or stream_type == 'video'
+
+class FakeYouTube:
+    def __init__(self, streams: list):
+        self._streams = streams
+
+    @property
+    def streams(self) -> StreamQuery:
+        return StreamQuery(self._streams)
+
+def synthetic_streams(count: int, seed: int = 0) -> list:
+    """A stream list shaped like YouTube's: a few progressive, mostly adaptive video, some audio.
+
+    1440p is deliberately missing so the resolution fallback is exercised.
+    """
+    rng = random.Random(seed)
+    streams = [FakeStream(18, 'video', 'mp4', '360p', '96kbps', progressive=True)]
+    while len(streams) < count:
+        if rng.random() < 0.25:
+            streams.append(FakeStream(len(streams), 'audio', rng.choice(('mp4', 'webm')), abr=rng.choice(AUDIO_BITRATES)))
+        else:
+            streams.append(FakeStream(len(streams), 'video', rng.choice(VIDEO_SUBTYPES), rng.choice(RESOLUTIONS)))
+    return streams
+
+def legacy_get_video_stream(yt, target_extension: str, resolution: str):
+    """The filter cascade StreamHandler used before StreamIndex"""
+    progressive_stream = yt.streams.filter(file_extension=target_extension, progressive=True, resolution=resolution).first()
+    if progressive_stream:
+        return progressive_stream, None
+    video_stream = yt.streams.filter(adaptive=True, file_extension=target_extension, resolution=resolution, only_video=True).first()
+    if not video_stream:
+        video_stream = yt.streams.filter(adaptive=True, resolution=resolution, only_video=True).first()
+    if not video_stream:
+        video_stream = yt.streams.filter(adaptive=True, only_video=True).order_by('resolution').desc().first()
+    audio_stream = yt.streams.filter(adaptive=True, only_audio=True).order_by('abr').desc().first()
+    return video_stream, audio_stream
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, nargs='+', default=[40, 200, 1000], help="Stream list sizes")
+    parser.add_argument('--repeat', type=int, default=200, help="Selections timed per case")
+    args = parser.parse_args()
+
+    requests = [('mp4', '720p'), ('webm', '1080p'), ('mp4', '1440p')]
+    print(f"{'streams':>8} {'request':>13} {'legacy us':>10} {'index us':>10} {'speedup':>8}  fallback (legacy -> index)")
+    for count in args.streams:
+        yt = FakeYouTube(synthetic_streams(count))
+        for extension, resolution in requests:
+            # StreamHandler prints its fallback notices; keep them out of the timings table
+            with contextlib.redirect_stdout(io.StringIO()):
+                legacy = timeit.timeit(lambda: legacy_get_video_stream(yt, extension, resolution), number=args.repeat)
+                indexed = timeit.timeit(lambda: StreamHandler.get_video_stream(yt, extension, resolution), number=args.repeat)
+                legacy_choice = legacy_get_video_stream(yt, extension, resolution)[0].resolution
+                indexed_choice = StreamHandler.get_video_stream(yt, extension, resolution)[0].resolution
+            print(f"{count:>8} {extension + ' ' + resolution:>13} {legacy / args.repeat * 1e6:>10.1f} "
+                  f"{indexed / args.repeat * 1e6:>10.1f} {legacy / indexed:>7.1f}x  {legacy_choice} -> {indexed_choice}")
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,84 @@
+"""Convert a folder of synthetic media to one container and check each file took the right path.
+
+Generates short clips with ffmpeg's test sources, plus the temporary files a run leaves
+around (.part, .part.json, _video_temp., .converting.), then runs Transcoder.convert_folder.
+Compatible tracks must be remuxed, the rest transcoded, and temporary files left untouched.
+A corrupt file must fail on its own without stopping the others.
+Needs ffmpeg and ffprobe on PATH. Run from the repository root:
+    python -m benchmarks.bench_transcode --seconds 5
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from ffmpeg import FFmpeg
+from transcoder import CONTAINER_CODECS, Transcoder, ffmpeg_tools_available, probe_codecs
+
+# (file name, ffmpeg output options, expected mode when converting to mp4)
+CLIPS = [
+    ("h264_aac.mkv", {'c:v': 'libx264', 'preset': 'ultrafast', 'c:a': 'aac'}, 'remux'),
+    ("mpeg4_mp3.avi", {'c:v': 'mpeg4', 'c:a': 'libmp3lame'}, 'remux'),
+    ("h264_aac.mp4", {'c:v': 'libx264', 'preset': 'ultrafast', 'c:a': 'aac'}, 'unchanged'),
+    ("wmv2_wmav2.wmv", {'c:v': 'wmv2', 'c:a': 'wmav2'}, 'transcode'),
+]
+TEMPORARY_FILES = ["Song.webm.part", "Song.webm.part.json", "Clip_video_temp.webm", "Clip.converting.mp4"]
+BROKEN_FILES = ["corrupt.mkv"]
+
+def make_clip(path: Path, seconds: int, options: dict):
+    """Encode a test pattern with a tone into path"""
+    FFmpeg().option('y').input(f"testsrc=size=640x360:rate=30:duration={seconds}", f='lavfi').input(
+        f"sine=frequency=440:duration={seconds}", f='lavfi'
+    ).output(str(path), {**options, 'shortest': None}).execute()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=int, default=5, help="Length of each generated clip")
+    args = parser.parse_args()
+    if not ffmpeg_tools_available():
+        sys.exit("This benchmark needs ffmpeg and ffprobe on PATH")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        for name, options, _ in CLIPS:
+            make_clip(temp_dir / name, args.seconds, options)
+        for name in TEMPORARY_FILES + BROKEN_FILES:
+            (temp_dir / name).write_bytes(b"not finished media")
+
+        transcoder = Transcoder('mp4')
+        started = time.perf_counter()
+        try:
+            changed = transcoder.convert_folder(temp_dir)
+        finally:
+            transcoder.close()
+        elapsed = time.perf_counter() - started
+        transcoder.print_summary()
+
+        failures = []
+        expected = {mode: sum(1 for _, _, clip_mode in CLIPS if clip_mode == mode) for mode in transcoder.counts}
+        expected['failed'] = len(BROKEN_FILES)
+        if transcoder.counts != expected:
+            failures.append(f"modes {transcoder.counts}, expected {expected}")
+        allowed_video, allowed_audio = CONTAINER_CODECS['mp4']
+        for name, _, _ in CLIPS:
+            output = (temp_dir / name).with_suffix('.mp4')
+            if not output.exists():
+                failures.append(f"{output.name} missing")
+                continue
+            video_codec, audio_codec = probe_codecs(output)
+            if video_codec not in allowed_video or audio_codec not in allowed_audio:
+                failures.append(f"{output.name} holds {video_codec}/{audio_codec}")
+        touched = {old.name for old, _ in changed} & set(TEMPORARY_FILES)
+        missing = [name for name in TEMPORARY_FILES if not (temp_dir / name).exists()]
+        if touched or missing:
+            failures.append(f"temporary files converted: {sorted(touched | set(missing))}")
+
+        print(f"converted {len(CLIPS)} clips in {elapsed:.2f}s")
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        if failures:
+            sys.exit(1)
+        print("OK")
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,96 @@
+import http.server
+import random
+import re
+import threading
+import time
+
+class FakeStreamServer:
+    """Local HTTP server that serves media bytes with Range support.
+
+    Every path serves the same payload: synthetic bytes of the given size, or the
+    contents of a real file passed as payload. Latency is added before each response,
+    bandwidth is capped per connection to mimic per-connection throttling, and
+    failure_rate drops that share of requests without a response.
+    """
+
+    def __init__(self, size: int = 32 * 1024 * 1024, latency: float = 0.0,
+                 bandwidth: float | None = None, failure_rate: float = 0.0, payload: bytes | None = None):
+        self.payload = payload if payload is not None else bytes(range(256)) * (size // 256) + bytes(size % 256)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/videoplayback?id=fake"
+
+    def start(self) -> 'FakeStreamServer':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                if server.failure_rate and random.random() < server.failure_rate:
+                    self.close_connection = True
+                    return
+
+                payload = server.payload
+                match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get('Range', ''))
+                if match:
+                    start = int(match.group(1))
+                    end = min(int(match.group(2) or len(payload) - 1), len(payload) - 1)
+                    if start >= len(payload):
+                        self.send_error(416)
+                        return
+                    self.send_response(206)
+                    self.send_header('Content-Range', f"bytes {start}-{end}/{len(payload)}")
+                else:
+                    start, end = 0, len(payload) - 1
+                    self.send_response(200)
+                self.send_header('Content-Type', 'video/mp4')
+                self.send_header('Content-Length', str(end - start + 1))
+                self.end_headers()
+                self._send_throttled(memoryview(payload)[start:end + 1])
+
+            def _send_throttled(self, body: memoryview):
+                chunk_size = 64 * 1024
+                started = time.perf_counter()
+                for offset in range(0, len(body), chunk_size):
+                    try:
+                        self.wfile.write(body[offset:offset + chunk_size])
+                    except ConnectionError:
+                        # The client stopped reading, as interrupted and cancelled fetches do
+                        self.close_connection = True
+                        return
+                    if server.bandwidth:
+                        # Sleep until this connection is back under its byte rate
+                        ahead = (offset + chunk_size) / server.bandwidth - (time.perf_counter() - started)
+                        if ahead > 0:
+                            time.sleep(ahead)
+
+        return Handler
\ No newline at end of file
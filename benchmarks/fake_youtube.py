@@ -0,0 +1,149 @@
+"""Stand-ins for pytubefix YouTube, Playlist and Channel backed by a FakeStreamServer.
+
+Every fake video offers one progressive mp4 stream and two audio-only streams,
+all served from the same local server, so the real download, selection and
+bookkeeping code runs end to end without touching YouTube. Metadata resolution
+costs one simulated round trip of `latency` seconds.
+"""
+import time
+import urllib.request
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from pytubefix.query import StreamQuery
+from benchmarks.bench_stream_selection import FakeStream
+from benchmarks.fake_stream_server import FakeStreamServer
+
+class FakeMediaStream(FakeStream):
+    """A stream whose bytes come from the fake server, downloaded the way pytubefix does"""
+    RANGE_SIZE = 9 * 1024 * 1024
+
+    def __init__(self, yt: 'FakeYouTube', itag: int, stream_type: str, subtype: str, filesize: int,
+                 resolution: str | None = None, abr: str | None = None, progressive: bool = False):
+        super().__init__(itag, stream_type, subtype, resolution, abr, progressive)
+        self._yt = yt
+        self.filesize = filesize
+        self.url = yt.server.url
+        self.is_sabr = False
+        self.video_codec = 'avc1.640028' if subtype == 'mp4' else 'vp9'
+        self.audio_codec = 'mp4a.40.2' if subtype == 'mp4' else 'opus'
+        self.mime_type = f"{stream_type}/{subtype}"
+
+    def get_file_path(self, filename: str | None = None, output_path: str | None = None) -> str:
+        return str(Path(output_path or '.') / (filename or f"{self._yt.title}.{self.subtype}"))
+
+    def download(self, output_path: str | None = None, filename: str | None = None) -> str:
+        """Fetch the stream in whole 9 MB ranges, reporting each one like pytubefix's on_progress"""
+        file_path = self.get_file_path(filename, output_path)
+        remaining = self.filesize
+        with open(file_path, 'wb') as file:
+            for start in range(0, self.filesize, self.RANGE_SIZE):
+                end = min(start + self.RANGE_SIZE, self.filesize) - 1
+                request = urllib.request.Request(self.url, headers={'Range': f"bytes={start}-{end}"})
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    chunk = response.read()
+                file.write(chunk)
+                remaining -= len(chunk)
+                if self._yt.on_progress is not None:
+                    self._yt.on_progress(self, chunk, remaining)
+        return file_path
+
+class FakeYouTube:
+    server: FakeStreamServer = None
+    latency = 0.0
+
+    def __init__(self, url: str, on_progress_callback=None, client: str = 'WEB', **kwargs):
+        self.video_id = url.rsplit('v=', 1)[-1][:11]
+        self.watch_url = url
+        self.on_progress = on_progress_callback
+        self.client = client
+        self.author = "Fake channel"
+        self.length = 300
+        self.views = 1000
+        number = int(self.video_id[4:]) if self.video_id[4:].isdigit() else 0
+        self.publish_date = datetime(2024, 1, 1) - timedelta(days=number)
+        self._vid_info = None
+
+    @property
+    def title(self) -> str:
+        return self.vid_info['videoDetails']['title']
+
+    @property
+    def vid_info(self) -> dict:
+        if self._vid_info is None:
+            time.sleep(self.latency)  # the player request
+            self._vid_info = {'videoDetails': {'videoId': self.video_id, 'title': f"Fake video {self.video_id}"}}
+        return self._vid_info
+
+    @vid_info.setter
+    def vid_info(self, value: dict):
+        self._vid_info = value
+
+    def register_on_progress_callback(self, callback):
+        self.on_progress = callback
+
+    @property
+    def streams(self) -> StreamQuery:
+        self.vid_info
+        size = len(self.server.payload)
+        return StreamQuery([
+            FakeMediaStream(self, 18, 'video', 'mp4', size, '360p', '96kbps', progressive=True),
+            FakeMediaStream(self, 140, 'audio', 'mp4', size // 8, abr='128kbps'),
+            FakeMediaStream(self, 251, 'audio', 'webm', size // 8, abr='160kbps'),
+        ])
+
+def fake_video_url(number: int) -> str:
+    return f"https://www.youtube.com/watch?v=fake{number:07d}"
+
+class FakePlaylist:
+    """A playlist listed in pages of 100, each page costing one round trip"""
+    PAGE_SIZE = 100
+    videos = 20
+    first_video = 0
+
+    def __init__(self, url: str = "https://www.youtube.com/playlist?list=fake", **kwargs):
+        self.url = url
+        self.title = "Fake playlist"
+
+    def url_generator(self):
+        for number in range(self.first_video, self.first_video + self.videos):
+            if (number - self.first_video) % self.PAGE_SIZE == 0:
+                time.sleep(FakeYouTube.latency)
+            yield fake_video_url(number)
+
+    @property
+    def video_urls(self) -> list[str]:
+        return list(self.url_generator())
+
+class FakeChannel(FakePlaylist):
+    """Uploads plus one playlist on the home tab that repeats half of them"""
+
+    def __init__(self, url: str = "https://www.youtube.com/@fake", **kwargs):
+        super().__init__(url)
+        self.channel_name = "Fake channel"
+        self.title = self.channel_name
+
+    @property
+    def home(self) -> list:
+        playlist = FakePlaylist()
+        playlist.videos = self.videos // 2
+        return [playlist]
+
+@contextmanager
+def patched_pytubefix(server: FakeStreamServer, latency: float = 0.0, videos: int = 20):
+    """Point pytubefix at the fakes for the duration of the block.
+
+    The downloader modules import pytubefix's classes when they first use them,
+    so replacing them on the package is enough.
+    """
+    import pytubefix
+
+    FakeYouTube.server, FakeYouTube.latency = server, latency
+    FakePlaylist.videos = videos
+    originals = {name: getattr(pytubefix, name) for name in ('YouTube', 'Playlist', 'Channel')}
+    pytubefix.YouTube, pytubefix.Playlist, pytubefix.Channel = FakeYouTube, FakePlaylist, FakeChannel
+    try:
+        yield
+    finally:
+        for name, original in originals.items():
+            setattr(pytubefix, name, original)
\ No newline at end of file
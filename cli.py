@@ -0,0 +1,207 @@
+"""Non-interactive entry point for scripted and scheduled downloads.
+
+Examples:
+    python cli.py "https://www.youtube.com/watch?v=..." --type audio --extension mp3
+    python cli.py --batch-file urls.txt --workers 4 --zip
+    cat urls.txt | python cli.py --batch-file - --resolution 1080p
+    python cli.py "https://www.youtube.com/@channel" --plan plan.json
+    python cli.py --from-plan plan.json
+"""
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+from config import (DownloadConfig, FileType, VALID_VIDEO_FILE_TYPES, VALID_AUDIO_FILE_TYPES,
+                    AVAILABLE_RESOLUTIONS, MAX_PARALLEL_DOWNLOADS)
+
+def parse_size(value: str) -> int:
+    """Parse a byte size or rate such as 800K, 2.5M, 1G or 50G/s into bytes"""
+    multipliers = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+    text = value.strip().upper().removesuffix('/S').removesuffix('B')
+    multiplier = multipliers.get(text[-1:], 1)
+    try:
+        size = float(text[:-1] if multiplier > 1 else text) * multiplier
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size '{value}', expected e.g. 800K or 2M")
+    if size < 0:
+        raise argparse.ArgumentTypeError("size can't be negative")
+    return int(size)
+
+def read_urls(lines) -> list[str]:
+    """Collect URLs from lines of text, skipping blanks and # comments"""
+    urls = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            urls.append(line)
+    return urls
+
+def build_parser() -> argparse.ArgumentParser:
+    defaults = DownloadConfig()
+    parser = argparse.ArgumentParser(
+        description="Download YouTube videos, playlists and channels without interactive prompts.",
+        epilog=__doc__.split("\n\n", 1)[1],
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('urls', nargs='*', help="Video, playlist or channel URLs")
+    parser.add_argument('-b', '--batch-file', type=Path,
+                        help="File with one URL per line; '-' reads from stdin")
+
+    output = parser.add_argument_group("output")
+    output.add_argument('-t', '--type', choices=('video', 'audio'), default=defaults.file_type.name.lower(),
+                        help="Download video (with audio) or audio only")
+    output.add_argument('-e', '--extension', help=(
+        f"Output format. Video: {', '.join(VALID_VIDEO_FILE_TYPES)}. Audio: {', '.join(VALID_AUDIO_FILE_TYPES)}. "
+        f"Defaults to {defaults.file_extension} for video and m4a for audio"
+    ))
+    output.add_argument('-r', '--resolution', choices=AVAILABLE_RESOLUTIONS, default=defaults.resolution,
+                        help="Video resolution")
+    output.add_argument('-o', '--output', type=Path, default=Path(__file__).resolve().parent,
+                        help="Folder the Download directory is created in")
+    output.add_argument('-z', '--zip', action='store_true', help="Compress the downloads into a ZIP archive")
+    output.add_argument('--no-incremental-zip', action='store_true',
+                        help="Build the ZIP at the end instead of adding files as they finish")
+
+    selection = parser.add_argument_group("selection")
+    selection.add_argument('--since', type=date.fromisoformat, metavar='YYYY-MM-DD',
+                           help="Skip videos published before this date; channel listings stop at the first older upload")
+    selection.add_argument('--max-items', type=int, default=defaults.max_items, metavar='N',
+                           help="Take at most N videos from each playlist or channel (0 = all)")
+
+    planning = parser.add_argument_group("planning").add_mutually_exclusive_group()
+    planning.add_argument('--plan', type=Path, metavar='FILE',
+                          help="Resolve the URLs and write what would be downloaded to FILE (.json or .csv) "
+                               "without transferring any media")
+    planning.add_argument('--from-plan', type=Path, metavar='FILE',
+                          help="Download the videos in a plan written by --plan, in the format it was planned for")
+
+    storage = parser.add_argument_group("storage")
+    storage.add_argument('--disk-budget', type=parse_size, default=defaults.disk_budget, metavar='SIZE',
+                         help="Most this run may write to disk, e.g. 50G; videos that would exceed it wait or are refused")
+    storage.add_argument('--min-free-space', type=parse_size, default=defaults.min_free_space, metavar='SIZE',
+                         help="Free space to always leave on the download volume")
+    storage.add_argument('--media-store', action='store_true',
+                         help="Keep one copy of each video in Download/.media and hard link it into run folders")
+
+    performance = parser.add_argument_group("performance")
+    performance.add_argument('-w', '--workers', type=int, default=defaults.max_workers,
+                             help=f"Videos downloaded in parallel (1-{MAX_PARALLEL_DOWNLOADS})")
+    performance.add_argument('--processes', type=int, default=defaults.processes,
+                             help="Split the videos across this many worker processes, each running --workers downloads")
+    performance.add_argument('--merge-workers', type=int, default=defaults.merge_workers,
+                             help="Background ffmpeg merge workers; 0 merges inline")
+    performance.add_argument('--merge-queue-depth', type=int, default=defaults.merge_queue_depth,
+                             help="Downloaded videos allowed to wait for a merge worker")
+    performance.add_argument('--transcode-workers', type=int, default=defaults.transcode_workers,
+                             help="Parallel ffmpeg conversions; 0 uses one per CPU")
+    performance.add_argument('--stream-audio', action='store_true',
+                             help="Pipe audio downloads straight into ffmpeg instead of saving the source file first")
+    performance.add_argument('--segments', type=int, default=defaults.download_segments,
+                             help="Connections used for each large stream")
+    performance.add_argument('--resume', action='store_true',
+                             help="Keep partial downloads in Download/.partial and continue them on retries and later runs")
+    performance.add_argument('--no-manifest', action='store_true',
+                             help="Download everything again instead of skipping videos in the manifest")
+    performance.add_argument('--metadata-cache-ttl', type=int, default=defaults.metadata_cache_ttl,
+                             help="Seconds resolved video metadata is reused for")
+    performance.add_argument('--metadata-cache-on-disk', action='store_true',
+                             help="Also keep resolved metadata on disk for later runs")
+    performance.add_argument('--limit-rate', type=parse_size, default=defaults.bandwidth_limit, metavar='RATE',
+                             help="Cap total download speed across all transfers, e.g. 800K or 2M bytes/s")
+    performance.add_argument('--retries', type=int, default=defaults.max_retries,
+                             help="Times to retry a video after a transient failure such as HTTP 429 or a dropped connection")
+    performance.add_argument('--retry-delay', type=float, default=defaults.retry_base_delay,
+                             help="Base delay in seconds for exponential retry backoff")
+    performance.add_argument('--rate-limit', type=float, default=defaults.requests_per_second, metavar='PER_SECOND',
+                             help="Start at most this many video downloads per second across all workers (0 = unlimited)")
+    performance.add_argument('--metrics', action='store_true',
+                             help="Print per-phase timings and throughput at the end of the run")
+    performance.add_argument('--metrics-log', type=Path, metavar='FILE',
+                             help="Append timing events to FILE as JSON lines (implies --metrics)")
+    return parser
+
+def build_config(args: argparse.Namespace, parser: argparse.ArgumentParser) -> DownloadConfig:
+    """Turn parsed arguments into a DownloadConfig, rejecting invalid combinations"""
+    config = DownloadConfig()
+    config.file_type = FileType.AUDIO if args.type == 'audio' else FileType.VIDEO
+    valid_extensions = VALID_AUDIO_FILE_TYPES if config.file_type == FileType.AUDIO else VALID_VIDEO_FILE_TYPES
+    config.file_extension = (args.extension or ('m4a' if config.file_type == FileType.AUDIO else 'mp4')).lower()
+    if config.file_extension not in valid_extensions:
+        parser.error(f"--extension for {args.type} must be one of: {', '.join(valid_extensions)}")
+    if not 1 <= args.workers <= MAX_PARALLEL_DOWNLOADS:
+        parser.error(f"--workers must be between 1 and {MAX_PARALLEL_DOWNLOADS}")
+    if args.processes < 1:
+        parser.error("--processes must be 1 or more")
+    if args.transcode_workers < 0 or args.merge_workers < 0 or args.merge_queue_depth < 1 or args.segments < 1:
+        parser.error("--transcode-workers and --merge-workers must be 0 or more, "
+                     "--merge-queue-depth and --segments 1 or more")
+
+    config.resolution = args.resolution
+    config.create_zip = args.zip
+    config.incremental_zip = not args.no_incremental_zip
+    config.max_workers = args.workers
+    config.processes = args.processes
+    config.transcode_workers = args.transcode_workers
+    config.merge_workers = args.merge_workers
+    config.merge_queue_depth = args.merge_queue_depth
+    config.stream_audio = args.stream_audio
+    config.download_segments = args.segments
+    config.resume_downloads = args.resume
+    config.use_manifest = not args.no_manifest
+    config.use_media_store = args.media_store
+    config.metadata_cache_ttl = args.metadata_cache_ttl
+    config.metadata_cache_on_disk = args.metadata_cache_on_disk
+    config.max_items = max(0, args.max_items)
+    config.published_after = args.since
+    config.disk_budget = args.disk_budget
+    config.min_free_space = args.min_free_space
+    config.bandwidth_limit = args.limit_rate
+    config.max_retries = args.retries
+    config.retry_base_delay = args.retry_delay
+    config.requests_per_second = args.rate_limit
+    config.collect_metrics = args.metrics or args.metrics_log is not None
+    config.metrics_log = args.metrics_log
+    return config
+
+def collect_urls(args: argparse.Namespace) -> list[str]:
+    """Gather URLs from the command line, a batch file and/or stdin"""
+    urls = list(args.urls)
+    if args.batch_file is not None:
+        if str(args.batch_file) == '-':
+            urls += read_urls(sys.stdin)
+        else:
+            with open(args.batch_file, encoding='utf-8') as batch_file:
+                urls += read_urls(batch_file)
+    elif not urls and not sys.stdin.isatty():
+        urls += read_urls(sys.stdin)
+    # Keep the first occurrence of each URL
+    return list(dict.fromkeys(urls))
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    config = build_config(args, parser)
+    urls = [] if args.from_plan else collect_urls(args)
+    if not urls and not args.from_plan:
+        parser.error("no URLs given; pass them as arguments, with --batch-file, or on stdin")
+
+    # Imported here so --help and argument errors don't pay for loading pytubefix
+    from main import YouTubeDownloaderApp
+    app = YouTubeDownloaderApp(config)
+    if args.plan:
+        plan = app.plan_batch(urls, args.output.resolve(), args.plan)
+        return 1 if plan.failures else 0
+    if args.from_plan:
+        from download_plan import DownloadPlan
+        try:
+            plan = DownloadPlan.load(args.from_plan)
+        except (OSError, ValueError, KeyError) as e:
+            parser.error(f"couldn't read plan {args.from_plan}: {e}")
+        app.run_plan(plan, args.output.resolve())
+    else:
+        app.run_batch(urls, args.output.resolve())
+    # Non-zero when any video still failed after retries, so scripts can notice
+    return 1 if app.playlist_downloader.failed_downloads else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -1,4 +1,5 @@
 from enum import Enum
+from datetime import date
 from pathlib import Path
 
 # Valid file extensions
@@ -8,6 +9,9 @@ VALID_AUDIO_FILE_TYPES = ('mp3', 'wav', 'aac', 'ogg', 'wma', 'flac', 'm4a')
 # Available video resolutions
 AVAILABLE_RESOLUTIONS = ('144p', '240p', '360p', '480p', '720p', '1080p', '1440p', '2160p')
 
+# Upper bound on parallel playlist/channel downloads
+MAX_PARALLEL_DOWNLOADS = 16
+
 class FileType(Enum):
     VIDEO = 1
     AUDIO = 2
@@ -18,4 +22,27 @@ class DownloadConfig:
         self.file_extension: str = 'mp4'
         self.resolution: str = '720p'
         self.create_zip: bool = False
-        self.download_path: Path = Path()
\ No newline at end of file
+        self.incremental_zip: bool = True
+        self.stream_audio: bool = False
+        self.transcode_workers: int = 0  # 0 uses one per CPU
+        self.download_path: Path = Path()
+        self.max_workers: int = 1
+        self.processes: int = 1  # download shards, each with max_workers threads
+        self.merge_workers: int = 0
+        self.merge_queue_depth: int = 2
+        self.use_manifest: bool = True
+        self.use_media_store: bool = False
+        self.resume_downloads: bool = False
+        self.download_segments: int = 1
+        self.metadata_cache_ttl: int = 3600
+        self.metadata_cache_on_disk: bool = False
+        self.max_items: int = 0  # per playlist or channel, 0 is unlimited
+        self.published_after: date | None = None
+        self.disk_budget: int = 0  # bytes, 0 is unlimited
+        self.min_free_space: int = 256 * 1024 * 1024
+        self.bandwidth_limit: int = 0  # bytes per second, 0 is unlimited
+        self.max_retries: int = 3
+        self.retry_base_delay: float = 2.0
+        self.requests_per_second: float = 0  # 0 disables the rate limit
+        self.collect_metrics: bool = False
+        self.metrics_log: Path | None = None
\ No newline at end of file
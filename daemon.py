@@ -0,0 +1,326 @@
+"""Resident download service with a persistent job queue and a local HTTP/JSON API.
+
+Jobs are a list of URLs plus options named after the cli.py flags. They run on
+shared resources (manifest, metadata cache, bandwidth limiter, ffmpeg worker
+pool and metrics), so submitting work costs no process startup. Options for those
+shared resources are set when the service starts, not per job. The queue is kept in Download/jobs.jsonl and
+jobs that were running when the service stopped are queued again on restart.
+
+    python daemon.py --port 8765 --jobs 2 --limit-rate 4M
+
+    curl -X POST localhost:8765/jobs -d '{"urls": ["https://www.youtube.com/watch?v=..."],
+                                          "options": {"type": "audio", "extension": "mp3"}}'
+    curl localhost:8765/jobs/<id>
+    curl -X DELETE localhost:8765/jobs/<id>
+    curl -X PUT localhost:8765/bandwidth -d '{"bytes_per_second": 2097152}'
+"""
+import argparse
+import http.server
+import json
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from bandwidth_limiter import BandwidthLimiter
+from config import DownloadConfig
+from download_manifest import DownloadManifest
+from metadata_cache import MetadataCache
+from media_store import MediaStore
+from metrics import Metrics
+from stream_handler import StreamHandler
+from transcoder import Transcoder
+from ui_handler import UIHandler
+import cli
+
+# Options a job may not set because the service decides them, or that only print and exit
+RESERVED_OPTIONS = {'output', 'batch_file', 'urls', 'plan', 'from_plan', 'help', 'version'}
+# Options for resources every job shares; they are daemon.py flags instead
+SERVICE_OPTIONS = {'limit_rate', 'metadata_cache_ttl', 'metadata_cache_on_disk', 'transcode_workers',
+                   'metrics', 'metrics_log', 'processes'}
+
+def config_from_options(options: dict) -> DownloadConfig:
+    """Build a DownloadConfig from cli.py flag names, validated exactly like the command line"""
+    unknown = RESERVED_OPTIONS.intersection(options)
+    if unknown:
+        raise ValueError(f"options not allowed for jobs: {', '.join(sorted(unknown))}")
+    shared = SERVICE_OPTIONS.intersection(options)
+    if shared:
+        raise ValueError(f"options set for the whole service, not per job: {', '.join(sorted(shared))}")
+    argv = []
+    for key, value in options.items():
+        flag = f"--{key.replace('_', '-')}"
+        if value is True:
+            argv.append(flag)
+        elif value not in (False, None):
+            argv += [flag, str(value)]
+
+    parser = cli.build_parser()
+
+    def reject(message: str):
+        raise ValueError(message)
+
+    # Report bad options to the client instead of exiting the service
+    parser.error = reject
+    parser.exit = lambda status=0, message=None: reject(message or "options must not end option parsing")
+    # Option names must be spelled out, so e.g. 'he' can't reach --help
+    parser.allow_abbrev = False
+    return cli.build_config(parser.parse_args(argv), parser)
+
+class JobStore:
+    """Append-only JSON-lines log of job states; the last line for a job wins"""
+    FILE_NAME = "jobs.jsonl"
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.jobs: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if path.exists():
+            with open(path, encoding='utf-8') as jobs_file:
+                for line in jobs_file:
+                    try:
+                        job = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.jobs[job['id']] = job
+        # Jobs cut off by a shutdown start over; the manifest skips what they finished
+        for job in self.jobs.values():
+            if job['status'] == 'running':
+                self.save({**job, 'status': 'queued', 'started_at': None})
+
+    def save(self, job: dict) -> dict:
+        with self._lock:
+            self.jobs[job['id']] = job
+            with open(self.path, 'a', encoding='utf-8') as jobs_file:
+                jobs_file.write(json.dumps(job) + "\n")
+        return job
+
+    def all_jobs(self) -> list[dict]:
+        """Every job, oldest first"""
+        with self._lock:
+            return sorted(self.jobs.values(), key=lambda job: job['submitted_at'])
+
+    def next_queued(self) -> dict | None:
+        """Oldest queued job"""
+        with self._lock:
+            queued = [job for job in self.jobs.values() if job['status'] == 'queued']
+        return min(queued, key=lambda job: job['submitted_at']) if queued else None
+
+class DownloadDaemon:
+    def __init__(self, base_path: Path, host: str = '127.0.0.1', port: int = 8765, concurrent_jobs: int = 1,
+                 service_config: DownloadConfig | None = None):
+        self.base_path = base_path
+        download_dir = base_path / "Download"
+        download_dir.mkdir(parents=True, exist_ok=True)
+        self.store = JobStore(download_dir / JobStore.FILE_NAME)
+        # Shared by every job for the life of the service, configured from SERVICE_OPTIONS
+        self.service_config = service_config or DownloadConfig()
+        self.manifest = DownloadManifest(download_dir / DownloadManifest.FILE_NAME)
+        cache_dir = download_dir / ".metadata_cache" if self.service_config.metadata_cache_on_disk else None
+        self.metadata_cache = MetadataCache(ttl=self.service_config.metadata_cache_ttl, cache_dir=cache_dir)
+        self.media_store = MediaStore(download_dir / MediaStore.DIR_NAME)
+        self.bandwidth_limiter = BandwidthLimiter(self.service_config.bandwidth_limit)
+        self.transcode_pool = Transcoder.create_pool(self.service_config.transcode_workers or None)
+        if self.service_config.collect_metrics:
+            Metrics.configure(self.service_config.metrics_log)
+        self.concurrent_jobs = max(1, concurrent_jobs)
+        self._running: dict[str, object] = {}
+        self._condition = threading.Condition()
+        self._stopping = False
+        self.server = http.server.ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+
+    def submit(self, urls: list[str], options: dict) -> dict:
+        """Validate and queue a job"""
+        if not urls or not all(isinstance(url, str) and url.strip() for url in urls):
+            raise ValueError("urls must be a non-empty list of URLs")
+        config_from_options(options)
+        job = self.store.save({
+            'id': uuid.uuid4().hex[:12], 'urls': [url.strip() for url in urls], 'options': options,
+            'status': 'queued', 'submitted_at': time.time(), 'started_at': None, 'finished_at': None,
+            'download_path': None, 'succeeded': 0, 'failed': 0, 'error': None,
+        })
+        with self._condition:
+            self._condition.notify()
+        return job
+
+    def cancel(self, job_id: str) -> dict:
+        """Cancel a queued job; running jobs can't be interrupted"""
+        job = self.store.jobs[job_id]
+        if job['status'] != 'queued':
+            raise ValueError(f"job is {job['status']}, only queued jobs can be cancelled")
+        return self.store.save({**job, 'status': 'cancelled', 'finished_at': time.time()})
+
+    def status(self, job_id: str) -> dict:
+        """Job record with live progress while it runs"""
+        job = dict(self.store.jobs[job_id])
+        app = self._running.get(job_id)
+        if app is not None:
+            job['succeeded'] = app.playlist_downloader.succeeded_downloads
+            job['failed'] = app.playlist_downloader.failed_downloads
+            job['download_path'] = str(app.config.download_path)
+        return job
+
+    def _take_job(self) -> dict | None:
+        with self._condition:
+            while not self._stopping:
+                job = self.store.next_queued()
+                if job is not None:
+                    return self.store.save({**job, 'status': 'running', 'started_at': time.time()})
+                self._condition.wait()
+            return None
+
+    def _run_job(self, job: dict):
+        # Imported here so the API is up before pytubefix and ffmpeg are loaded
+        from main import YouTubeDownloaderApp
+        try:
+            app = YouTubeDownloaderApp(config_from_options(job['options']))
+            app.hosted = True
+            app.metadata_cache = self.metadata_cache
+            app.bandwidth_limiter = self.bandwidth_limiter
+            app.transcode_pool = self.transcode_pool
+            if app.config.use_manifest:
+                app.manifest = self.manifest
+            if app.config.use_media_store:
+                app.media_store = self.media_store
+            self._running[job['id']] = app
+            final_path = app.run_batch(job['urls'], self.base_path)
+            downloads = app.playlist_downloader
+            self.store.save({
+                **job, 'status': 'failed' if downloads.failed_downloads else 'completed',
+                'finished_at': time.time(), 'download_path': str(final_path),
+                'succeeded': downloads.succeeded_downloads, 'failed': downloads.failed_downloads,
+            })
+        except (Exception, SystemExit) as e:
+            # Setup code may exit(), e.g. when the download folder can't be made; that ends the job, not the worker
+            error = f"exited with status {e.code}" if isinstance(e, SystemExit) else str(e)
+            UIHandler.print_error(f"Job {job['id']} stopped: {error}")
+            self.store.save({**job, 'status': 'error', 'finished_at': time.time(), 'error': error})
+        finally:
+            self._running.pop(job['id'], None)
+
+    def _job_worker(self):
+        while (job := self._take_job()) is not None:
+            self._run_job(job)
+
+    def serve_forever(self):
+        host, port = self.server.server_address[:2]
+        workers = [threading.Thread(target=self._job_worker, name=f"job-{i}", daemon=True)
+                   for i in range(self.concurrent_jobs)]
+        for worker in workers:
+            worker.start()
+        UIHandler.print_success(f"Listening on http://{host}:{port} with {self.concurrent_jobs} job worker(s)")
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            UIHandler.print_info("Shutting down; running jobs will be resumed on the next start")
+        finally:
+            with self._condition:
+                self._stopping = True
+                self._condition.notify_all()
+            self.server.server_close()
+            StreamHandler.print_merge_summary()
+            if self.service_config.collect_metrics:
+                Metrics.print_summary()
+                Metrics.close()
+            self.transcode_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _make_handler(self):
+        daemon = self
+        job_path = re.compile(r"^/jobs/([0-9a-f]+)$")
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _read_json(self) -> dict:
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+                if not isinstance(body, dict):
+                    raise ValueError("request body must be a JSON object")
+                return body
+
+            def do_GET(self):
+                if self.path == '/health':
+                    return self._reply(200, {'status': 'ok', 'running': list(daemon._running)})
+                if self.path == '/jobs':
+                    return self._reply(200, [daemon.status(job['id']) for job in daemon.store.all_jobs()])
+                match = job_path.match(self.path)
+                if match and match.group(1) in daemon.store.jobs:
+                    return self._reply(200, daemon.status(match.group(1)))
+                self._reply(404, {'error': 'not found'})
+
+            def do_POST(self):
+                if self.path != '/jobs':
+                    return self._reply(404, {'error': 'not found'})
+                try:
+                    body = self._read_json()
+                    job = daemon.submit(body.get('urls') or [], body.get('options') or {})
+                except (ValueError, TypeError, AttributeError) as e:
+                    return self._reply(400, {'error': str(e)})
+                self._reply(202, job)
+
+            def do_PUT(self):
+                if self.path != '/bandwidth':
+                    return self._reply(404, {'error': 'not found'})
+                try:
+                    rate = int(self._read_json().get('bytes_per_second', 0))
+                except (ValueError, TypeError) as e:
+                    return self._reply(400, {'error': str(e)})
+                daemon.bandwidth_limiter.set_rate(rate)
+                self._reply(200, {'bytes_per_second': daemon.bandwidth_limiter.rate})
+
+            def do_DELETE(self):
+                match = job_path.match(self.path)
+                if not match or match.group(1) not in daemon.store.jobs:
+                    return self._reply(404, {'error': 'not found'})
+                try:
+                    self._reply(200, daemon.cancel(match.group(1)))
+                except ValueError as e:
+                    self._reply(409, {'error': str(e)})
+
+        return Handler
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Run the downloader as a local service with an HTTP/JSON job API.")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on; keep it local unless you trust the network")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--jobs', type=int, default=1, help="Jobs run at the same time")
+    parser.add_argument('-o', '--output', type=Path, default=Path(__file__).resolve().parent,
+                        help="Folder that holds the Download directory")
+    shared = parser.add_argument_group("shared by every job")
+    shared.add_argument('--limit-rate', type=cli.parse_size, default=0, metavar='RATE',
+                        help="Cap total download speed across all jobs, e.g. 2M bytes/s; change it live with PUT /bandwidth")
+    shared.add_argument('--metadata-cache-ttl', type=int, default=DownloadConfig().metadata_cache_ttl,
+                        help="Seconds resolved video metadata is reused for")
+    shared.add_argument('--metadata-cache-on-disk', action='store_true',
+                        help="Also keep resolved metadata on disk across restarts")
+    shared.add_argument('--transcode-workers', type=int, default=0,
+                        help="ffmpeg conversion processes for all jobs; 0 uses one per CPU")
+    shared.add_argument('--metrics', action='store_true',
+                        help="Print per-phase timings for every job when the service stops")
+    shared.add_argument('--metrics-log', type=Path, metavar='FILE',
+                        help="Append timing events of every job to FILE as JSON lines (implies --metrics)")
+    args = parser.parse_args(argv)
+    if args.transcode_workers < 0:
+        parser.error("--transcode-workers must be 0 or more")
+
+    service_config = DownloadConfig()
+    service_config.bandwidth_limit = args.limit_rate
+    service_config.metadata_cache_ttl = args.metadata_cache_ttl
+    service_config.metadata_cache_on_disk = args.metadata_cache_on_disk
+    service_config.transcode_workers = args.transcode_workers
+    service_config.collect_metrics = args.metrics or args.metrics_log is not None
+    service_config.metrics_log = args.metrics_log
+    DownloadDaemon(args.output.resolve(), args.host, args.port, args.jobs, service_config).serve_forever()
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
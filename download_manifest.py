@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import threading
+import zipfile
+from pathlib import Path
+from config import FileType
+
+class DownloadManifest:
+    """Append-only JSON-lines index of finished downloads.
+
+    Entries are keyed by video ID plus the requested format, so a re-run can
+    skip a video before resolving it. Later lines override earlier ones. Files
+    that were zipped are found by their member name in the archive.
+    """
+    FILE_NAME = "manifest.jsonl"
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def make_key(video_id: str, file_type: FileType, target_extension: str, resolution: str) -> str:
+        """Build the manifest key for a video in a requested format"""
+        if file_type == FileType.AUDIO:
+            resolution = ""
+        return f"{video_id}:{file_type.name.lower()}:{target_extension}:{resolution}"
+
+    @staticmethod
+    def file_checksum(file_path: Path) -> str:
+        """Return the SHA-256 of a file, read in chunks"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _load(self):
+        """Read existing entries, ignoring a torn last line from an interrupted run"""
+        if not self.path.exists():
+            return
+        with open(self.path, encoding='utf-8') as manifest_file:
+            for line in manifest_file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.entries[entry['key']] = entry
+
+    def _resolve(self, relative_path: str) -> Path:
+        return self.path.parent / relative_path
+
+    def _relative(self, file_path: Path) -> str:
+        return Path(os.path.relpath(file_path.resolve(), self.path.parent.resolve())).as_posix()
+
+    def _append(self, entry: dict):
+        self.entries[entry['key']] = entry
+        with open(self.path, 'a', encoding='utf-8') as manifest_file:
+            manifest_file.write(json.dumps(entry) + "\n")
+
+    def output_path(self, entry: dict) -> Path | None:
+        """Absolute path of the file an entry refers to, or None if it is inside an archive"""
+        if 'member' in entry:
+            return None
+        return self._resolve(entry['path'])
+
+    @staticmethod
+    def _member_size(zip_path: Path, member: str) -> int | None:
+        try:
+            with zipfile.ZipFile(zip_path) as zip_file:
+                return zip_file.getinfo(member).file_size
+        except (OSError, KeyError, zipfile.BadZipFile):
+            return None
+
+    def lookup(self, key: str) -> dict | None:
+        """Return the entry for key if its output file is still present and complete"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        output_path = self._resolve(entry['path'])
+        if 'member' in entry:
+            size = self._member_size(output_path, entry['member']) if output_path.is_file() else None
+        else:
+            size = output_path.stat().st_size if output_path.is_file() else None
+        if size != entry['size']:
+            return None
+        return entry
+
+    def record(self, key: str, video_id: str, itag: int | None, output_path: Path):
+        """Record a finished output file with its size and checksum"""
+        entry = {
+            'key': key,
+            'video_id': video_id,
+            'itag': itag,
+            'path': self._relative(output_path),
+            'size': output_path.stat().st_size,
+            'sha256': self.file_checksum(output_path),
+        }
+        with self._lock:
+            self._append(entry)
+
+    def relocate(self, old_path: Path, new_path: Path):
+        """Point entries at a file that has been renamed, moved or converted"""
+        old_relative = self._relative(old_path)
+        with self._lock:
+            matches = [entry for entry in self.entries.values() if entry['path'] == old_relative]
+            if not matches:
+                return
+            size = new_path.stat().st_size
+            checksum = self.file_checksum(new_path)
+            for entry in matches:
+                self._append({**entry, 'path': self._relative(new_path), 'size': size, 'sha256': checksum})
+
+    def archived(self, dir_path: Path, zip_path: Path):
+        """Point entries for files in dir_path at their members in zip_path, once the folder is zipped"""
+        folder = self._relative(dir_path) + "/"
+        with self._lock:
+            # Worker processes of a sharded run append to the file too
+            self._load()
+            for entry in list(self.entries.values()):
+                if 'member' not in entry and entry['path'].startswith(folder):
+                    self._append({**entry, 'path': self._relative(zip_path), 'member': entry['path'][len(folder):]})
\ No newline at end of file
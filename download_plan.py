@@ -0,0 +1,209 @@
+import csv
+import json
+import time
+from collections import Counter
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+from config import FileType
+from stream_handler import StreamHandler
+from transcoder import plan_conversion, stream_audio_codec, stream_video_codec
+from ui_handler import UIHandler
+
+# One row per video. Every row carries the requested format, so a CSV plan can be executed like a JSON one.
+PLAN_FIELDS = (
+    'file_type', 'extension', 'resolution', 'video_id', 'url', 'title', 'author', 'length',
+    'mode', 'bytes', 'merge', 'conversion', 'expires_at',
+    'video_itag', 'video_url', 'video_filesize', 'video_subtype', 'video_codec', 'video_resolution', 'video_filename',
+    'audio_itag', 'audio_url', 'audio_filesize', 'audio_subtype', 'audio_codec', 'audio_abr', 'audio_filename',
+)
+INTEGER_FIELDS = {'length', 'bytes', 'expires_at', 'video_itag', 'video_filesize', 'audio_itag', 'audio_filesize'}
+# Planned stream URLs this close to expiring are resolved again instead
+EXPIRY_MARGIN = 300
+
+class PlannedStream:
+    """The parts of a pytubefix Stream a download needs, rebuilt from a plan entry"""
+
+    def __init__(self, entry: dict, prefix: str):
+        self.itag = entry[f'{prefix}_itag']
+        self.url = entry[f'{prefix}_url']
+        self.filesize = entry[f'{prefix}_filesize']
+        self.subtype = entry[f'{prefix}_subtype']
+        self.video_codec = entry['video_codec'] if prefix == 'video' else None
+        self.audio_codec = entry['audio_codec'] if prefix == 'audio' else None
+        self.resolution = entry.get('video_resolution')
+        self.abr = entry.get('audio_abr')
+        self.is_progressive = entry['mode'] == 'progressive'
+        self.is_sabr = False
+        self._filename = entry[f'{prefix}_filename']
+
+    def get_file_path(self, filename: str | None = None, output_path: str | None = None) -> str:
+        return str(Path(output_path or '.') / (filename or self._filename))
+
+    def download(self, output_path: str | None = None, filename: str | None = None) -> str:
+        raise RuntimeError("Planned streams are only fetched directly by URL")
+
+class PlannedVideo:
+    """Stands in for a resolved YouTube object when downloading from a plan"""
+
+    def __init__(self, entry: dict):
+        self.video_id = entry['video_id']
+        self.watch_url = entry['url']
+        self.title = entry['title']
+        self.author = entry['author']
+        self.length = entry['length']
+
+def _stream_fields(prefix: str, stream) -> dict:
+    # Read the filename first; pytubefix renames audio-only mp4 subtypes to m4a while building it
+    filename = Path(stream.get_file_path()).name
+    fields = {
+        f'{prefix}_itag': stream.itag, f'{prefix}_url': stream.url, f'{prefix}_filesize': stream.filesize,
+        f'{prefix}_subtype': stream.subtype, f'{prefix}_filename': filename,
+    }
+    if prefix == 'video':
+        fields.update(video_codec=stream.video_codec, video_resolution=stream.resolution)
+    else:
+        fields.update(audio_codec=stream.audio_codec, audio_abr=stream.abr)
+    return fields
+
+def _expiry(*streams) -> int | None:
+    """Earliest expiry timestamp in the stream URLs, if they carry one"""
+    expiries = []
+    for stream in streams:
+        value = parse_qs(urlsplit(stream.url or '').query).get('expire')
+        if value and value[0].isdigit():
+            expiries.append(int(value[0]))
+    return min(expiries) if expiries else None
+
+def conversion_mode(stream, target_extension: str) -> str:
+    """How the finished file of a single stream will be converted: unchanged, remux or transcode"""
+    video_codec = stream_video_codec(getattr(stream, 'video_codec', None)) if stream.includes_video_track else None
+    options = plan_conversion(video_codec, stream_audio_codec(getattr(stream, 'audio_codec', None)), target_extension)
+    copies_everything = all(options.get(key, 'copy') == 'copy' for key in ('c:v', 'c:a'))
+    if not copies_everything:
+        return 'transcode'
+    return 'unchanged' if stream.subtype == target_extension else 'remux'
+
+def plan_entry(yt, video_id: str | None, url: str, stream, audio_stream, file_type: FileType,
+             target_extension: str, resolution: str) -> dict:
+    """Plan entry for a resolved video and the streams StreamHandler.get_stream chose for it"""
+    entry = dict.fromkeys(PLAN_FIELDS)
+    entry.update(
+        file_type=file_type.name.lower(), extension=target_extension, resolution=resolution,
+        video_id=video_id, url=url, title=yt.title, author=yt.author, length=yt.length,
+    )
+    if file_type == FileType.AUDIO:
+        entry.update(mode='audio', bytes=stream.filesize, **_stream_fields('audio', stream))
+        entry['conversion'] = conversion_mode(stream, target_extension)
+    elif audio_stream is None:
+        entry.update(mode='progressive', bytes=stream.filesize, **_stream_fields('video', stream))
+        entry['conversion'] = conversion_mode(stream, target_extension)
+    else:
+        entry.update(mode='adaptive', bytes=stream.filesize + audio_stream.filesize,
+                     **_stream_fields('video', stream), **_stream_fields('audio', audio_stream))
+        _, entry['merge'] = StreamHandler.merge_options(
+            stream_video_codec(stream.video_codec), stream_audio_codec(audio_stream.audio_codec), target_extension
+        )
+        entry['conversion'] = 'unchanged'
+    entry['expires_at'] = _expiry(*(s for s in (stream, audio_stream) if s is not None))
+    return entry
+
+def planned_streams(entry: dict) -> tuple[PlannedStream, PlannedStream | None]:
+    """(main stream, audio stream to merge) for an entry, in the shape StreamHandler.get_stream returns"""
+    if entry['mode'] == 'audio':
+        return PlannedStream(entry, 'audio'), None
+    if entry['mode'] == 'progressive':
+        return PlannedStream(entry, 'video'), None
+    return PlannedStream(entry, 'video'), PlannedStream(entry, 'audio')
+
+def is_executable(entry: dict) -> bool:
+    """Whether an entry's stream URLs can still be fetched without resolving the video again"""
+    sizes = [entry['audio_filesize']] if entry['mode'] == 'audio' else [entry['video_filesize']]
+    if entry['mode'] == 'adaptive':
+        sizes.append(entry['audio_filesize'])
+    if not all(sizes):
+        return False
+    return entry['expires_at'] is None or entry['expires_at'] - EXPIRY_MARGIN > time.time()
+
+class DownloadPlan:
+    """What a batch would download: the chosen streams of every video, their sizes and post-processing.
+
+    Saved as JSON (with totals, listing failures and videos skipped because an
+    earlier run already has them) or CSV (one row per video to download). Either
+    can be loaded and executed later without resolving again.
+    """
+
+    def __init__(self, file_type: FileType, target_extension: str, resolution: str):
+        self.file_type = file_type
+        self.target_extension = target_extension
+        self.resolution = resolution
+        self.entries: list[dict] = []
+        self.failures: list[dict] = []
+        self.skipped: list[dict] = []
+        self.created_at = time.time()
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(entry['bytes'] or 0 for entry in self.entries)
+
+    def counts(self, field: str) -> dict[str, int]:
+        return dict(Counter(entry[field] for entry in self.entries if entry[field]))
+
+    def save(self, path: Path):
+        """Write the plan as CSV if path ends in .csv, otherwise as JSON"""
+        if path.suffix.lower() == '.csv':
+            with open(path, 'w', newline='', encoding='utf-8') as plan_file:
+                writer = csv.DictWriter(plan_file, fieldnames=PLAN_FIELDS)
+                writer.writeheader()
+                writer.writerows(self.entries)
+            return
+        path.write_text(json.dumps({
+            'created_at': self.created_at,
+            'file_type': self.file_type.name.lower(),
+            'extension': self.target_extension,
+            'resolution': self.resolution,
+            'videos': len(self.entries),
+            'total_bytes': self.total_bytes,
+            'modes': self.counts('mode'),
+            'merges': self.counts('merge'),
+            'conversions': self.counts('conversion'),
+            'entries': self.entries,
+            'skipped': self.skipped,
+            'failures': self.failures,
+        }, indent=2), encoding='utf-8')
+
+    @classmethod
+    def load(cls, path: Path) -> 'DownloadPlan':
+        """Read a plan written by save()"""
+        if path.suffix.lower() == '.csv':
+            with open(path, newline='', encoding='utf-8') as plan_file:
+                entries = [
+                    {key: (int(value) if key in INTEGER_FIELDS else value) if value != '' else None
+                     for key, value in row.items()}
+                    for row in csv.DictReader(plan_file)
+                ]
+            failures, skipped = [], []
+        else:
+            data = json.loads(path.read_text(encoding='utf-8'))
+            entries, failures, skipped = data['entries'], data['failures'], data.get('skipped', [])
+        if not entries:
+            raise ValueError(f"{path} has no videos to download")
+        first = entries[0]
+        plan = cls(FileType[first['file_type'].upper()], first['extension'], first['resolution'])
+        plan.entries, plan.failures, plan.skipped = entries, failures, skipped
+        return plan
+
+    def print_summary(self):
+        UIHandler.print_section_header("DOWNLOAD PLAN")
+        UIHandler.print_info(f"{len(self.entries)} videos, {self.total_bytes / (1024 * 1024):.1f} MB to transfer")
+        if self.skipped:
+            UIHandler.print_info(f"{len(self.skipped)} videos already downloaded by earlier runs, left out")
+        for label, field in (("Streams", 'mode'), ("Merges", 'merge'), ("Conversions", 'conversion')):
+            counts = self.counts(field)
+            if counts:
+                UIHandler.print_info(f"{label}: {', '.join(f'{count} {name}' for name, count in counts.items())}")
+        expiries = [entry['expires_at'] for entry in self.entries if entry['expires_at']]
+        if expiries:
+            hours = (min(expiries) - time.time()) / 3600
+            UIHandler.print_info(f"Stream URLs start expiring in {hours:.1f} hours; later runs resolve those videos again")
+        if self.failures:
+            UIHandler.print_error(f"Couldn't plan {len(self.failures)} URLs")
\ No newline at end of file
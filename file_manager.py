@@ -1,9 +1,33 @@
+import os
 import shutil
+import threading
 import zipfile
 from pathlib import Path
 from datetime import date, datetime
-from tqdm import tqdm
 from ui_handler import UIHandler
+from metrics import Metrics
+
+# Media containers whose contents are already compressed; DEFLATE only burns CPU on these
+COMPRESSED_MEDIA_SUFFIXES = frozenset((
+    '.mp4', '.mov', '.avi', '.mkv', '.wmv', '.webm', '.3gp',
+    '.mp3', '.aac', '.ogg', '.opus', '.wma', '.flac', '.m4a'
+))
+
+# Playlist files list the media beside them and keep their own extension
+PLAYLIST_SUFFIX = '.m3u8'
+
+# Names of files that only exist while a download, merge or conversion is in progress
+TEMPORARY_SUFFIXES = ('.part', '.part.json')
+TEMPORARY_MARKERS = ('_video_temp.', '_audio_temp.', '.converting.')
+
+def is_temporary(file_path: Path) -> bool:
+    """Whether a file is an unfinished partial or intermediate file rather than a finished download"""
+    name = file_path.name
+    return name.endswith(TEMPORARY_SUFFIXES) or any(marker in name for marker in TEMPORARY_MARKERS)
+
+def zip_compression_for(file_path: Path) -> int:
+    """Store compressed media as-is and DEFLATE everything else"""
+    return zipfile.ZIP_STORED if file_path.suffix.lower() in COMPRESSED_MEDIA_SUFFIXES else zipfile.ZIP_DEFLATED
 
 class FileManager:
     @staticmethod
@@ -12,37 +36,50 @@ class FileManager:
         try:
             download_dir = base_path / "Download"
             download_dir.mkdir(exist_ok=True)
-            dir_path = download_dir / f"{date.today()}_{datetime.now().strftime('%H-%M-%S')}"
-            dir_path.mkdir()
-            return dir_path
+            folder_name = f"{date.today()}_{datetime.now().strftime('%H-%M-%S')}"
+            dir_path = download_dir / folder_name
+            # Runs started within the same second each get their own folder
+            suffix = 1
+            while True:
+                try:
+                    dir_path.mkdir()
+                    return dir_path
+                except FileExistsError:
+                    suffix += 1
+                    dir_path = download_dir / f"{folder_name}_{suffix}"
         except Exception as e:
             print(f"ERROR! Couldn't make download folder. Aborting. {e}")
             exit(-1)
 
     @staticmethod
-    def change_file_extensions(dir_path: Path, file_extension: str):
-        """Change all files to specified extension"""
-        for file in dir_path.iterdir():
-            if file.is_file() and not file.name.endswith(f".{file_extension}"):
-                new_file = file.with_suffix(f".{file_extension}")
-                file.rename(new_file)
+    def write_playlist(dir_path: Path, title: str, entries: list[Path]) -> Path:
+        """Write an M3U playlist of already downloaded files into dir_path/playlists"""
+        from pytubefix.helpers import safe_filename
+        playlist_dir = dir_path / "playlists"
+        playlist_dir.mkdir(exist_ok=True)
+        playlist_path = playlist_dir / f"{safe_filename(title)}{PLAYLIST_SUFFIX}"
+        lines = ["#EXTM3U"]
+        for entry in entries:
+            lines.append(f"#EXTINF:-1,{entry.stem}")
+            lines.append(Path(os.path.relpath(entry, playlist_dir)).as_posix())
+        playlist_path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+        return playlist_path
 
     @staticmethod
     def create_zip_archive(dir_path: Path):
         """Create ZIP archive of all files and clean up original directory"""
+        from tqdm import tqdm
         zip_path = dir_path.with_suffix('.zip')
-        
-        # Count total files for progress bar
-        total_files = sum(1 for file in dir_path.rglob('*') if file.is_file())
+        files = [file for file in dir_path.rglob('*') if file.is_file() and not is_temporary(file)]
         
         UIHandler.print_info(f"Creating ZIP archive: {zip_path.name}")
         
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            with tqdm(total=total_files, desc="Archiving", unit="files") as pbar:
-                for file in dir_path.rglob('*'):
-                    if file.is_file():
+        with Metrics.phase("archive", bytes=sum(file.stat().st_size for file in files)):
+            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+                with tqdm(total=len(files), desc="Archiving", unit="files") as pbar:
+                    for file in files:
                         relative_path = file.relative_to(dir_path)
-                        zip_file.write(file, arcname=relative_path)
+                        zip_file.write(file, arcname=relative_path, compress_type=zip_compression_for(file))
                         pbar.update(1)
         
         UIHandler.print_success(f"Archive created: {zip_path}")
@@ -50,4 +87,41 @@ class FileManager:
         shutil.rmtree(dir_path)
         UIHandler.print_success("Cleanup completed")
         
-        return zip_path
\ No newline at end of file
+        return zip_path
+
+class StreamingZipArchive:
+    """ZIP archive that finished downloads are appended to one at a time.
+
+    Each file is deleted as soon as it is in the archive, so the batch is never
+    on disk twice and there is no archiving pass left to do at the end.
+    """
+
+    def __init__(self, dir_path: Path):
+        self.dir_path = dir_path
+        self.zip_path = dir_path.with_suffix('.zip')
+        self.archived_files = 0
+        self._lock = threading.Lock()
+        self._zip_file = zipfile.ZipFile(self.zip_path, 'w', zipfile.ZIP_DEFLATED)
+
+    def add(self, file_path: Path):
+        """Append a finished file under its own name and delete the original"""
+        arcname = file_path.relative_to(self.dir_path)
+        with Metrics.phase("archive", bytes=file_path.stat().st_size), self._lock:
+            self._zip_file.write(file_path, arcname=arcname, compress_type=zip_compression_for(file_path))
+            self.archived_files += 1
+        file_path.unlink()
+
+    def close(self) -> Path:
+        """Archive finished files left in the folder, finish the ZIP and remove the folder"""
+        leftovers = [file for file in self.dir_path.rglob('*') if file.is_file()]
+        temporary = [file for file in leftovers if is_temporary(file)]
+        for file in leftovers:
+            if not is_temporary(file):
+                self.add(file)
+        if temporary:
+            UIHandler.print_info(f"Left {len(temporary)} unfinished temporary files out of the archive")
+        with self._lock:
+            self._zip_file.close()
+        shutil.rmtree(self.dir_path)
+        UIHandler.print_success(f"Archive created: {self.zip_path} ({self.archived_files} files)")
+        return self.zip_path
\ No newline at end of file
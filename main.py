@@ -1,16 +1,101 @@
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from config import DownloadConfig, FileType
 from ui_handler import UIHandler
 from video_downloader import VideoDownloader
+from stream_handler import StreamHandler
 from batch_downloader import BatchDownloader
-from file_manager import FileManager
+from file_manager import FileManager, StreamingZipArchive
+from download_manifest import DownloadManifest
+from metadata_cache import MetadataCache
+from transcoder import Transcoder
+from metrics import Metrics
+from retry_scheduler import RetryScheduler
+from bandwidth_limiter import BandwidthLimiter
+from storage_planner import StoragePlanner
+from media_store import MediaStore
+from download_plan import DownloadPlan
+from stream_fetcher import StreamFetcher
 
 class YouTubeDownloaderApp:
-    def __init__(self):
-        self.config = DownloadConfig()
+    def __init__(self, config: DownloadConfig | None = None):
+        self.config = config or DownloadConfig()
         self.video_downloader = VideoDownloader()
-        self.playlist_downloader = BatchDownloader()
+        self.playlist_downloader = BatchDownloader(
+            self.config.max_workers, self.config.merge_workers, self.config.merge_queue_depth
+        )
         self.file_manager = FileManager()
+        # Anything set before setup_downloaders is reused, so a long-lived host can share it between runs
+        self.manifest: DownloadManifest | None = None
+        self.metadata_cache: MetadataCache | None = None
+        self.media_store: MediaStore | None = None
+        self.archive: StreamingZipArchive | None = None
+        self.transcoder: Transcoder | None = None
+        self.bandwidth_limiter: BandwidthLimiter | None = None
+        self.storage_planner: StoragePlanner | None = None
+        self.transcode_pool: ProcessPoolExecutor | None = None
+        # Set by a host running several apps at once; it then owns the process-wide metrics and merge counts
+        self.hosted = False
+
+    def setup_resolution(self, download_dir: Path):
+        """Apply the options that decide which videos are resolved and how, for downloads and plans alike"""
+        if self.metadata_cache is None:
+            cache_dir = download_dir / ".metadata_cache" if self.config.metadata_cache_on_disk else None
+            self.metadata_cache = MetadataCache(ttl=self.config.metadata_cache_ttl, cache_dir=cache_dir)
+        for downloader in (self.video_downloader, self.playlist_downloader.video_downloader):
+            downloader.metadata_cache = self.metadata_cache
+            downloader.published_after = self.config.published_after
+
+        self.playlist_downloader.max_items = self.config.max_items
+        self.playlist_downloader.retry_scheduler = RetryScheduler(
+            self.config.max_retries, self.config.retry_base_delay,
+            requests_per_second=self.config.requests_per_second
+        )
+
+        if self.config.collect_metrics and not self.hosted:
+            Metrics.configure(self.config.metrics_log)
+
+    def setup_stores(self, download_dir: Path):
+        """Open the manifest and media store that record what earlier runs finished"""
+        if self.config.use_manifest and self.manifest is None:
+            self.manifest = DownloadManifest(download_dir / DownloadManifest.FILE_NAME)
+        elif not self.config.use_manifest:
+            self.manifest = None
+
+        if self.config.use_media_store and self.media_store is None:
+            self.media_store = MediaStore(download_dir / MediaStore.DIR_NAME)
+        elif not self.config.use_media_store:
+            self.media_store = None
+
+        for downloader in (self.video_downloader, self.playlist_downloader.video_downloader):
+            downloader.manifest = self.manifest
+            downloader.media_store = self.media_store
+
+    def setup_downloaders(self):
+        """Apply download options to every downloader, sharing one manifest beside the per-run folders"""
+        self.setup_resolution(self.config.download_path.parent)
+        self.setup_stores(self.config.download_path.parent)
+
+        self.storage_planner = StoragePlanner(
+            self.config.download_path, self.config.disk_budget, self.config.min_free_space
+        )
+        # One limiter for every downloader, so the cap covers the whole process
+        if self.bandwidth_limiter is None:
+            self.bandwidth_limiter = BandwidthLimiter(self.config.bandwidth_limit)
+
+        for downloader in (self.video_downloader, self.playlist_downloader.video_downloader):
+            downloader.bandwidth_limiter = self.bandwidth_limiter
+            downloader.storage_planner = self.storage_planner
+            downloader.resume_downloads = self.config.resume_downloads
+            downloader.partial_dir = self.config.download_path.parent / StreamFetcher.PARTIAL_DIR_NAME
+            downloader.download_segments = self.config.download_segments
+            downloader.stream_audio = self.config.stream_audio
+
+    def set_bandwidth_limit(self, bytes_per_second: int):
+        """Change the download speed cap while downloads are running; 0 removes it"""
+        self.config.bandwidth_limit = bytes_per_second
+        if self.bandwidth_limiter is not None:
+            self.bandwidth_limiter.set_rate(bytes_per_second)
 
     def setup_configuration(self):
         """Setup download configuration from user input"""
@@ -27,11 +112,27 @@ class YouTubeDownloaderApp:
         if self.config.file_type == FileType.VIDEO:
             self.config.resolution = UIHandler.get_resolution()
         
+        # Get parallelism for playlist and channel downloads
+        if self.determine_download_type(url) != 'single':
+            self.config.max_workers = UIHandler.get_worker_count()
+            self.playlist_downloader.max_workers = self.config.max_workers
+
         # Get ZIP preference
         self.config.create_zip = UIHandler.get_zip_preference()
         
         return url
 
+    def setup_post_processing(self):
+        """Convert files as they finish, and archive them straight away when incremental ZIP is on"""
+        self.transcoder = Transcoder(self.config.file_extension, self.config.transcode_workers or None, self.transcode_pool)
+        if self.config.create_zip and self.config.incremental_zip:
+            self.archive = StreamingZipArchive(self.config.download_path)
+            UIHandler.print_info(f"Archiving files into {self.archive.zip_path.name} as they finish")
+
+        for downloader in (self.video_downloader, self.playlist_downloader.video_downloader):
+            downloader.transcoder = self.transcoder
+            downloader.archive = self.archive
+
     def determine_download_type(self, url: str) -> str:
         """Determine the type of URL provided"""
         if '/playlist?' in url:
@@ -67,16 +168,142 @@ class YouTubeDownloaderApp:
     def post_process_files(self):
         """Handle post-processing of downloaded files"""
         UIHandler.print_section_header("POST-PROCESSING")
-        UIHandler.print_info("Converting file extensions...")
-        self.file_manager.change_file_extensions(self.config.download_path, self.config.file_extension)
-        UIHandler.print_success("File extension conversion completed")
+        if self.archive is not None:
+            # Files were converted and archived as they finished
+            self.print_merge_summary()
+            self.transcoder.print_summary()
+            self.transcoder.close()
+            zip_path = self.archive.close()
+            if self.manifest is not None:
+                self.manifest.archived(self.config.download_path, zip_path)
+            return zip_path
+
+        UIHandler.print_info(f"Converting remaining files to {self.config.file_extension}...")
+        converted = self.transcoder.convert_folder(self.config.download_path)
+        if self.manifest is not None:
+            for old_path, new_path in converted:
+                self.manifest.relocate(old_path, new_path)
+        self.print_merge_summary()
+        self.transcoder.print_summary()
+        self.transcoder.close()
+        UIHandler.print_success("File conversion completed")
 
         final_path = self.config.download_path
         if self.config.create_zip:
-            final_path = self.file_manager.create_zip_archive(self.config.download_path)
+            # The archive is written in full before the folder is removed
+            folder_size = sum(file.stat().st_size for file in final_path.rglob('*') if file.is_file())
+            missing = self.storage_planner.check(folder_size) if self.storage_planner is not None else 0
+            if missing:
+                UIHandler.print_error(f"Not enough disk space to archive the downloads "
+                                      f"({missing / (1024 * 1024):.0f} MB short), keeping the folder")
+            else:
+                final_path = self.file_manager.create_zip_archive(self.config.download_path)
+                if self.manifest is not None:
+                    self.manifest.archived(self.config.download_path, final_path)
 
         return final_path
 
+    def run_batch(self, urls: list[str], base_path: Path):
+        """Download many URLs in one process without prompting, using the current configuration"""
+        self.config.download_path = self.file_manager.get_download_folder(base_path)
+        if self.config.processes > 1:
+            return self.run_sharded(urls)
+        self.setup_downloaders()
+        self.setup_post_processing()
+
+        # Individual videos share one worker pool; playlists and channels run one after another
+        single_urls = [url for url in urls if self.determine_download_type(url) == 'single']
+        if single_urls:
+            UIHandler.print_section_header("STARTING DOWNLOAD")
+            self.playlist_downloader.download_videos(
+                single_urls, self.config.file_type, self.config.file_extension,
+                self.config.resolution, self.config.download_path
+            )
+        for url in urls:
+            download_type = self.determine_download_type(url)
+            if download_type != 'single':
+                self.start_download(url, download_type)
+
+        final_path = self.post_process_files()
+        self.report_metrics()
+        self.show_completion(final_path)
+        return final_path
+
+    def run_sharded(self, urls: list[str]):
+        """Download many URLs across config.processes worker processes, then post-process once"""
+        from shard_coordinator import ShardCoordinator
+        # Shards can't write into one archive together, so it is built once at the end
+        self.config.incremental_zip = False
+        self.setup_downloaders()
+        self.setup_post_processing()
+
+        UIHandler.print_section_header("STARTING DOWNLOAD")
+        coordinator = ShardCoordinator(self.config, self.config.processes)
+        summary = coordinator.run([(self.determine_download_type(url), url) for url in urls], self.config.download_path)
+        self.playlist_downloader.succeeded_downloads += summary['succeeded']
+        self.playlist_downloader.failed_downloads += summary['failed']
+        # The shards converted their files as they finished; only leftovers still need a pass
+        self.transcoder.mark_converted(summary['outputs'].values())
+        for mode, count in summary['converted'].items():
+            self.transcoder.counts[mode] += count
+
+        final_path = self.post_process_files()
+        self.report_metrics()
+        self.show_completion(final_path)
+        return final_path
+
+    def plan_batch(self, urls: list[str], base_path: Path, plan_path: Path) -> DownloadPlan:
+        """Resolve every URL and save what downloading it would fetch, without transferring any media"""
+        download_dir = base_path / "Download"
+        download_dir.mkdir(parents=True, exist_ok=True)
+        self.setup_resolution(download_dir)
+        # Videos earlier runs finished would be skipped, so they aren't part of the plan
+        self.setup_stores(download_dir)
+
+        UIHandler.print_section_header("PLANNING DOWNLOAD")
+        plan = self.playlist_downloader.plan(
+            [(self.determine_download_type(url), url) for url in urls],
+            self.config.file_type, self.config.file_extension, self.config.resolution
+        )
+        plan.save(plan_path)
+        plan.print_summary()
+        self.report_metrics()
+        UIHandler.print_success(f"Plan written to {plan_path}")
+        return plan
+
+    def run_plan(self, plan: DownloadPlan, base_path: Path):
+        """Download a plan saved by plan_batch, in the format it was planned for"""
+        self.config.file_type = plan.file_type
+        self.config.file_extension = plan.target_extension
+        self.config.resolution = plan.resolution
+        self.config.download_path = self.file_manager.get_download_folder(base_path)
+        self.setup_downloaders()
+        self.setup_post_processing()
+
+        self.playlist_downloader.download_plan(plan, self.config.download_path)
+
+        final_path = self.post_process_files()
+        self.report_metrics()
+        self.show_completion(final_path)
+        return final_path
+
+    def print_merge_summary(self):
+        """Report the run's merge paths, unless a host is counting merges across runs"""
+        if not self.hosted:
+            StreamHandler.print_merge_summary()
+
+    def report_metrics(self):
+        """Print the performance summary and close the metrics log"""
+        if self.config.collect_metrics and not self.hosted:
+            Metrics.print_summary()
+            Metrics.close()
+
+    def show_completion(self, final_path: Path):
+        """Show completion message"""
+        UIHandler.print_section_header("DOWNLOAD COMPLETE")
+        UIHandler.print_success("All operations completed!")
+        print(f"📁 Files location: {final_path}")
+
     def run(self):
         """Main application entry point"""
         # Display title
@@ -85,9 +312,11 @@ class YouTubeDownloaderApp:
         # Setup download folder
         base_path = Path(__file__).resolve().parent
         self.config.download_path = self.file_manager.get_download_folder(base_path)
+        self.setup_downloaders()
         
         # Get configuration from user
         url = self.setup_configuration()
+        self.setup_post_processing()
         
         # Determine download type and start
         download_type = self.determine_download_type(url)
@@ -95,11 +324,10 @@ class YouTubeDownloaderApp:
         
         # Post-process files
         final_path = self.post_process_files()
+        self.report_metrics()
         
         # Show completion message
-        UIHandler.print_section_header("DOWNLOAD COMPLETE")
-        UIHandler.print_success("All operations completed!")
-        print(f"📁 Files location: {final_path}")
+        self.show_completion(final_path)
 
 def main():
     app = YouTubeDownloaderApp()
@@ -0,0 +1,94 @@
+import filecmp
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from config import FileType
+from ui_handler import UIHandler
+
+class MediaStore:
+    """Keeps one copy of each finished file, keyed by video ID and requested format.
+
+    Files live in <root>/<video ID>/<format>/<file name>. Run folders get hard
+    links to them, so a video fetched by any earlier run or concurrent job is
+    linked in instead of transferred again, and deleting or zipping a run folder
+    only removes its links. On filesystems without hard links files are copied.
+    """
+    DIR_NAME = ".media"
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._copy_warned = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def format_name(file_type: FileType, target_extension: str, resolution: str) -> str:
+        """Directory name for a requested format, matching DownloadManifest.make_key"""
+        if file_type == FileType.AUDIO:
+            return f"audio-{target_extension}"
+        return f"video-{target_extension}-{resolution}"
+
+    def _entry_dir(self, video_id: str, format_name: str) -> Path:
+        return self.root / video_id / format_name
+
+    def lookup(self, video_id: str, format_name: str) -> Path | None:
+        """Stored file for a video in a format, if a run has finished it"""
+        entry_dir = self._entry_dir(video_id, format_name)
+        if not entry_dir.is_dir():
+            return None
+        # Files only appear under their final name once complete; temp names start with '.'
+        stored = [file for file in entry_dir.iterdir() if file.is_file() and not file.name.startswith('.')]
+        return stored[0] if stored else None
+
+    def _link(self, source: Path, target: Path):
+        """Hard link source to target, copying when the filesystem can't link"""
+        try:
+            os.link(source, target)
+        except FileExistsError:
+            raise
+        except OSError as e:
+            with self._lock:
+                if not self._copy_warned:
+                    self._copy_warned = True
+                    UIHandler.print_info(f"Hard links unavailable ({e.strerror}), copying files instead")
+            shutil.copy2(source, target)
+
+    def add(self, video_id: str, format_name: str, file_path: Path) -> Path:
+        """Store a finished file, leaving file_path in place as a link to the stored copy"""
+        entry_dir = self._entry_dir(video_id, format_name)
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = entry_dir / f".{uuid.uuid4().hex}.tmp"
+        self._link(file_path, temp_path)
+        # Replace atomically, so a concurrent lookup never sees a partial file
+        for stale in entry_dir.iterdir():
+            if stale.is_file() and not stale.name.startswith('.') and stale.name != file_path.name:
+                stale.unlink(missing_ok=True)
+        stored_path = entry_dir / file_path.name
+        temp_path.replace(stored_path)
+        return stored_path
+
+    def _same_file(self, stored_path: Path, target: Path) -> bool:
+        """Whether target is a link to stored_path, or a copy of it where links are unavailable"""
+        try:
+            if os.path.samefile(stored_path, target):
+                return True
+            return self._copy_warned and filecmp.cmp(stored_path, target, shallow=False)
+        except OSError:
+            return False
+
+    def link_into(self, stored_path: Path, dir_path: Path) -> Path:
+        """Link a stored file into a run folder under its original name, or a numbered one if that is taken"""
+        number = 1
+        while True:
+            name = stored_path.name if number == 1 else f"{stored_path.stem} ({number}){stored_path.suffix}"
+            target = dir_path / name
+            try:
+                self._link(stored_path, target)
+                return target
+            except FileExistsError:
+                # Another video with the same title may already have this name
+                if self._same_file(stored_path, target):
+                    return target
+            number += 1
\ No newline at end of file
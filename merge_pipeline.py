@@ -0,0 +1,72 @@
+import queue
+import threading
+from typing import Callable
+from pathlib import Path
+from stream_handler import StreamHandler
+from ui_handler import UIHandler
+from metrics import Metrics
+
+class MergePipeline:
+    """Background ffmpeg merge stage fed by a bounded queue.
+
+    Downloads hand finished video/audio pairs to submit() and move straight on to
+    the next fetch. submit() blocks once queue_depth jobs are waiting, which caps
+    how many unmerged temp files can pile up on disk. on_failure is called from
+    the worker each time a merge fails.
+    """
+
+    def __init__(self, workers: int = 1, queue_depth: int = 2, on_failure: Callable[[], None] | None = None):
+        self.jobs: queue.Queue = queue.Queue(maxsize=max(1, queue_depth))
+        self.on_failure = on_failure
+        self.successful_merges = 0
+        self.failed_merges = 0
+        self._lock = threading.Lock()
+        self._workers = [
+            threading.Thread(target=self._merge_worker, name=f"merge-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, title: str, video_path: Path, audio_path: Path, output_path: Path, file_seconds: int,
+               on_complete: Callable[[Path], None] | None = None, codecs: tuple[str | None, str | None] = (None, None)):
+        """Queue a merge job, waiting for a free slot if the queue is full"""
+        self.jobs.put((Metrics.current_video(), title, video_path, audio_path, output_path, file_seconds,
+                       on_complete, codecs))
+
+    def _merge_worker(self):
+        """Merge queued jobs until a shutdown sentinel arrives"""
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+
+            video_id, title, video_path, audio_path, output_path, file_seconds, on_complete, codecs = job
+            print(f"Merging video and audio for '{title}'...")
+            with Metrics.bind(video_id):
+                merged = StreamHandler.merge_video_audio(video_path, audio_path, output_path, file_seconds, *codecs)
+                if merged and on_complete is not None:
+                    try:
+                        on_complete(output_path)
+                    except Exception as e:
+                        UIHandler.print_error(f"Failed to record '{title}': {str(e)}")
+            with self._lock:
+                if merged:
+                    self.successful_merges += 1
+                else:
+                    self.failed_merges += 1
+
+            if merged:
+                UIHandler.print_success(f"'{title}' merged successfully!")
+            else:
+                UIHandler.print_error(f"Failed to merge streams for '{title}'")
+                if self.on_failure is not None:
+                    self.on_failure()
+
+    def close(self) -> int:
+        """Wait for all queued merges to finish and return the number that failed"""
+        for _ in self._workers:
+            self.jobs.put(None)
+        for worker in self._workers:
+            worker.join()
+        return self.failed_merges
\ No newline at end of file
@@ -0,0 +1,89 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pytubefix import YouTube
+
+class MetadataCache:
+    """Cache of resolved YouTube objects keyed by video ID.
+
+    Recently used objects stay in an in-memory LRU along with their parsed stream
+    lists. If cache_dir is given, the raw player response (vid_info) is also written
+    to disk, so a later process can rebuild a YouTube object without extracting it
+    again. Both layers expire entries after ttl seconds, which keeps them well inside
+    the lifetime of the signed stream URLs.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600, cache_dir: Path | None = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self._memory: OrderedDict[str, tuple[float, 'YouTube']] = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir is not None:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _disk_path(self, video_id: str) -> Path:
+        return self.cache_dir / f"{video_id}.json"
+
+    def _load_from_disk(self, video_id: str) -> dict | None:
+        """Return a fresh on-disk entry for video_id, or None"""
+        if self.cache_dir is None:
+            return None
+        try:
+            entry = json.loads(self._disk_path(video_id).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get('fetched_at', 0) > self.ttl:
+            return None
+        return entry
+
+    def resolve(self, url: str, video_id: str | None, on_progress_callback: Callable) -> 'YouTube':
+        """Return a YouTube object for url, reusing cached metadata where possible"""
+        from pytubefix import YouTube
+        if video_id is None:
+            return YouTube(url, on_progress_callback=on_progress_callback)
+
+        with self._lock:
+            cached = self._memory.get(video_id)
+            if cached is not None and time.monotonic() - cached[0] <= self.ttl:
+                self._memory.move_to_end(video_id)
+                yt = cached[1]
+                yt.register_on_progress_callback(on_progress_callback)
+                return yt
+
+        entry = self._load_from_disk(video_id)
+        if entry is not None:
+            yt = YouTube(url, client=entry['client'], on_progress_callback=on_progress_callback)
+            yt.vid_info = entry['vid_info']
+        else:
+            yt = YouTube(url, on_progress_callback=on_progress_callback)
+
+        with self._lock:
+            self._memory[video_id] = (time.monotonic(), yt)
+            self._memory.move_to_end(video_id)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+        return yt
+
+    def persist(self, video_id: str | None, yt: 'YouTube'):
+        """Write the extracted player response of yt to the on-disk store"""
+        if self.cache_dir is None or video_id is None or self._load_from_disk(video_id) is not None:
+            return
+        entry = {'fetched_at': time.time(), 'client': yt.client, 'vid_info': yt.vid_info}
+        temp_path = self._disk_path(video_id).with_suffix('.tmp')
+        temp_path.write_text(json.dumps(entry), encoding='utf-8')
+        temp_path.replace(self._disk_path(video_id))
+
+    def invalidate(self, video_id: str | None):
+        """Forget everything cached about a video, e.g. after its stream URLs stopped working"""
+        if video_id is None:
+            return
+        with self._lock:
+            self._memory.pop(video_id, None)
+        if self.cache_dir is not None:
+            self._disk_path(video_id).unlink(missing_ok=True)
\ No newline at end of file
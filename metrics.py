@@ -0,0 +1,188 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from ui_handler import UIHandler
+
+class Metrics:
+    """Per-video phase timings, byte counts and failure reasons.
+
+    Hooks across the pipeline wrap their work in Metrics.phase(). When enabled,
+    every phase and video outcome is appended to a JSON-lines event log, and
+    print_summary() reports p50/p95 durations and throughput per phase.
+    """
+    enabled = False
+    _log_file = None
+    _lock = threading.Lock()
+    _local = threading.local()
+    _durations: dict[str, list[float]] = {}
+    _bytes: dict[str, int] = {}
+    _failures: dict[str, int] = {}
+    _videos = {'ok': 0, 'failed': 0}
+
+    @classmethod
+    def configure(cls, log_path: Path | None):
+        """Start collecting metrics, writing events to log_path if given"""
+        cls.close()
+        cls.enabled = True
+        cls._durations, cls._bytes, cls._failures = {}, {}, {}
+        cls._videos = {'ok': 0, 'failed': 0}
+        if log_path is not None:
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+            cls._log_file = open(log_path, 'a', encoding='utf-8')
+
+    @classmethod
+    def close(cls):
+        with cls._lock:
+            if cls._log_file is not None:
+                cls._log_file.close()
+                cls._log_file = None
+
+    @classmethod
+    def _emit(cls, event: dict):
+        event = {'ts': round(time.time(), 3), **event}
+        if cls._log_file is not None:
+            line = json.dumps(event, default=str)
+            with cls._lock:
+                if cls._log_file is not None:
+                    cls._log_file.write(line + "\n")
+                    cls._log_file.flush()
+
+    @classmethod
+    def current_video(cls) -> str | None:
+        """Video ID the calling thread is working on, if any"""
+        return getattr(cls._local, 'video_id', None)
+
+    @classmethod
+    @contextmanager
+    def bind(cls, video_id: str | None):
+        """Attribute the phases run by this thread inside the block to video_id"""
+        previous_video, previous_error = cls.current_video(), getattr(cls._local, 'error', None)
+        cls._local.video_id, cls._local.error = video_id, None
+        try:
+            yield
+        finally:
+            cls._local.video_id, cls._local.error = previous_video, previous_error
+
+    @classmethod
+    def record_failure(cls, reason: str):
+        """Remember why the current video failed when no phase raised"""
+        cls._local.error = reason
+
+    @classmethod
+    @contextmanager
+    def video(cls, video_id: str | None, url: str | None = None):
+        """Bind phases to video_id and record the video's outcome.
+
+        The block should set outcome['ok'] to True once the video has been downloaded.
+        """
+        outcome = {'ok': False}
+        started = time.perf_counter()
+        with cls.bind(video_id):
+            try:
+                yield outcome
+            finally:
+                if cls.enabled:
+                    ok = bool(outcome['ok'])
+                    with cls._lock:
+                        cls._videos['ok' if ok else 'failed'] += 1
+                    cls._emit({
+                        'event': 'video', 'video_id': video_id, 'url': url, 'ok': ok,
+                        'seconds': round(time.perf_counter() - started, 4),
+                        'reason': None if ok else cls._local.error,
+                    })
+
+    @classmethod
+    @contextmanager
+    def phase(cls, name: str, video_id: str | None = None, **fields):
+        """Time one phase of work and record it.
+
+        Yields the fields dict, so the block can fill in bytes once known, or set
+        'error' to mark a failure it handled itself.
+        """
+        if not cls.enabled:
+            yield fields
+            return
+        started = time.perf_counter()
+        error = None
+        try:
+            yield fields
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            cls._local.error = error
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            if error is None and fields.get('error'):
+                error = cls._local.error = fields.pop('error')
+            fields.pop('error', None)
+            with cls._lock:
+                cls._durations.setdefault(name, []).append(seconds)
+                cls._bytes[name] = cls._bytes.get(name, 0) + (fields.get('bytes') or 0)
+                if error is not None:
+                    cls._failures[name] = cls._failures.get(name, 0) + 1
+            cls._emit({
+                'event': 'phase', 'phase': name, 'video_id': video_id or cls.current_video(),
+                'seconds': round(seconds, 4), 'ok': error is None, 'error': error, **fields
+            })
+
+    @staticmethod
+    def _percentile(values: list[float], fraction: float) -> float:
+        ordered = sorted(values)
+        return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+    @classmethod
+    def summary(cls) -> dict:
+        """Aggregate collected phases into counts, p50/p95 seconds and throughput"""
+        with cls._lock:
+            phases = {}
+            for name, durations in cls._durations.items():
+                total_seconds = sum(durations)
+                total_bytes = cls._bytes.get(name, 0)
+                phases[name] = {
+                    'count': len(durations),
+                    'failures': cls._failures.get(name, 0),
+                    'p50': cls._percentile(durations, 0.50),
+                    'p95': cls._percentile(durations, 0.95),
+                    'total_seconds': total_seconds,
+                    'bytes': total_bytes,
+                    'mb_per_second': total_bytes / total_seconds / (1024 * 1024) if total_bytes and total_seconds else None,
+                }
+            return {'videos': dict(cls._videos), 'phases': phases}
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        """Everything collected so far, in a form another process can merge()"""
+        with cls._lock:
+            return {
+                'durations': {name: list(durations) for name, durations in cls._durations.items()},
+                'bytes': dict(cls._bytes), 'failures': dict(cls._failures), 'videos': dict(cls._videos),
+            }
+
+    @classmethod
+    def merge(cls, snapshot: dict):
+        """Add metrics collected by another process, such as a download shard"""
+        with cls._lock:
+            for name, durations in snapshot['durations'].items():
+                cls._durations.setdefault(name, []).extend(durations)
+            for target, counts in ((cls._bytes, snapshot['bytes']), (cls._failures, snapshot['failures']),
+                                   (cls._videos, snapshot['videos'])):
+                for name, count in counts.items():
+                    target[name] = target.get(name, 0) + count
+
+    @classmethod
+    def print_summary(cls):
+        """Print the end-of-run summary and append it to the event log"""
+        if not cls.enabled:
+            return
+        summary = cls.summary()
+        cls._emit({'event': 'summary', **summary})
+        UIHandler.print_section_header("PERFORMANCE SUMMARY")
+        print(f"Videos: {summary['videos']['ok']} ok, {summary['videos']['failed']} failed")
+        print(f"{'phase':<18}{'count':>7}{'fail':>6}{'p50 s':>9}{'p95 s':>9}{'total s':>10}{'MB/s':>9}")
+        for name, phase in summary['phases'].items():
+            throughput = f"{phase['mb_per_second']:.1f}" if phase['mb_per_second'] else '-'
+            print(f"{name:<18}{phase['count']:>7}{phase['failures']:>6}{phase['p50']:>9.2f}"
+                  f"{phase['p95']:>9.2f}{phase['total_seconds']:>10.1f}{throughput:>9}")
\ No newline at end of file
@@ -0,0 +1,169 @@
+import heapq
+import http.client
+import random
+import socket
+import threading
+import time
+from typing import Callable, Iterable
+from urllib.error import HTTPError, URLError
+
+# Statuses worth another attempt: expired stream URLs/throttling, rate limits and server errors
+RETRYABLE_STATUSES = {403, 408, 429, 500, 502, 503, 504}
+NETWORK_ERRORS = (URLError, ConnectionError, TimeoutError, socket.timeout, http.client.HTTPException)
+
+def is_retryable(error: BaseException | None) -> bool:
+    """Whether a failed download could succeed if tried again later"""
+    if error is None:
+        return False
+    # Imported here so loading the scheduler doesn't load pytubefix
+    from pytubefix.exceptions import BotDetection, HTMLParseError, MaxRetriesExceeded, VideoUnavailable
+    if isinstance(error, HTTPError):
+        return error.code in RETRYABLE_STATUSES
+    if isinstance(error, VideoUnavailable):
+        # YouTube refusals that clear up on their own, unlike private/removed/age-restricted videos
+        return isinstance(error, BotDetection)
+    return isinstance(error, NETWORK_ERRORS + (MaxRetriesExceeded, HTMLParseError))
+
+def retry_after(error: BaseException | None) -> float:
+    """Seconds the server asked us to wait before retrying, or 0"""
+    headers = getattr(error, 'headers', None)
+    try:
+        return float(headers.get('Retry-After', 0)) if headers is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+class RateLimiter:
+    """Spaces out attempt starts across all workers to at most `rate` per second"""
+
+    def __init__(self, rate: float = 0):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+class RetryScheduler:
+    """Runs jobs on a worker pool and re-queues retryable failures with backoff.
+
+    A failed job whose error is_retryable() goes back on a shared queue, due after a
+    jittered exponential delay, instead of holding its worker while it waits. Every
+    attempt, first or retried, passes through one RateLimiter.
+    """
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 2.0, max_delay: float = 120.0,
+                 requests_per_second: float = 0):
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.retries = 0
+        self._intake_stopped = False
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number `attempt` (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def stop_intake(self):
+        """Stop taking new items from the running batch; queued retries still finish"""
+        self._intake_stopped = True
+
+    def run(self, items: Iterable, job: Callable[[object, int], tuple[bool, BaseException | None]],
+            workers: int = 1, on_retry: Callable[[object, int, float, BaseException], None] | None = None) -> list[bool]:
+        """Run job(item, attempt) for every item and return each item's final success.
+
+        Items are pulled from the iterable only when a worker is free, so a lazy
+        listing starts downloading with its first page. job returns
+        (succeeded, error); error decides whether a failure is retried.
+        """
+        source = iter(items)
+        taken: list = []
+        results: list[bool] = []
+        # Retries waiting for their backoff: (due time, sequence, item index, attempt)
+        pending: list[tuple[float, int, int, int]] = []
+        sequence = 0
+        in_flight = 0
+        fetching = False
+        exhausted = False
+        source_error: Exception | None = None
+        self._intake_stopped = False
+        condition = threading.Condition()
+
+        def next_job() -> tuple[int, int] | None:
+            """Wait for a due retry or the next new item; None once everything is done"""
+            nonlocal in_flight, fetching, exhausted, source_error
+            while True:
+                with condition:
+                    while True:
+                        if pending and pending[0][0] <= time.monotonic():
+                            _, _, index, attempt = heapq.heappop(pending)
+                            in_flight += 1
+                            return index, attempt
+                        intake_open = not exhausted and not self._intake_stopped
+                        if intake_open and not fetching:
+                            fetching = True
+                            break
+                        if not intake_open and not pending and not in_flight and not fetching:
+                            return None
+                        condition.wait(pending[0][0] - time.monotonic() if pending else None)
+
+                # Listing pages can take a while to load; don't hold up other workers meanwhile
+                try:
+                    item = next(source)
+                except StopIteration:
+                    item = None
+                    exhausted_now = True
+                except Exception as e:
+                    item, exhausted_now, source_error = None, True, e
+                else:
+                    exhausted_now = False
+
+                with condition:
+                    fetching = False
+                    condition.notify_all()
+                    if exhausted_now:
+                        exhausted = True
+                        continue
+                    taken.append(item)
+                    results.append(False)
+                    in_flight += 1
+                    return len(taken) - 1, 0
+
+        def worker():
+            nonlocal sequence, in_flight
+            while (next_item := next_job()) is not None:
+                index, attempt = next_item
+                self.rate_limiter.acquire()
+                try:
+                    succeeded, error = job(taken[index], attempt)
+                except Exception as e:
+                    succeeded, error = False, e
+
+                with condition:
+                    in_flight -= 1
+                    results[index] = succeeded
+                    if not succeeded and attempt < self.max_retries and is_retryable(error):
+                        delay = max(self.backoff(attempt + 1), retry_after(error))
+                        heapq.heappush(pending, (time.monotonic() + delay, sequence, index, attempt + 1))
+                        sequence += 1
+                        self.retries += 1
+                        if on_retry is not None:
+                            on_retry(taken[index], attempt + 1, delay, error)
+                    condition.notify_all()
+
+        threads = [threading.Thread(target=worker, name=f"download-{i}", daemon=True)
+                   for i in range(max(1, workers))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if source_error is not None:
+            raise source_error
+        return results
\ No newline at end of file
@@ -0,0 +1,266 @@
+import copy
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from itertools import islice
+from pathlib import Path
+from collections import Counter
+from config import DownloadConfig
+from file_manager import FileManager
+from metrics import Metrics
+from stream_handler import StreamHandler
+from ui_handler import UIHandler
+from video_downloader import VideoDownloader
+
+def run_shard(shard: int, shards: int, config: DownloadConfig, dir_path: Path, tasks, results):
+    """Worker process: download URLs from tasks into dir_path until None arrives, reporting on results"""
+    # Imported in the child, which starts from a fresh interpreter
+    from main import YouTubeDownloaderApp
+    app = YouTubeDownloaderApp(config)
+    app.config.download_path = dir_path
+    app.setup_downloaders()
+    # Every shard reserves against the same volume, so each gets its share of the free space
+    app.storage_planner.shares = shards
+    app.setup_post_processing()
+    downloads = app.playlist_downloader
+    successful_downloads = failed_downloads = 0
+    try:
+        successful_downloads, failed_downloads = downloads._download_videos(
+            iter(tasks.get, None), config.file_type, config.file_extension, config.resolution, dir_path,
+            on_result=lambda url, succeeded, too_old: results.put(('video', shard, url, succeeded, too_old))
+        )
+    except Exception as e:
+        UIHandler.print_error(f"Shard {shard} stopped: {str(e)}")
+    finally:
+        app.transcoder.close()
+        results.put(('summary', shard, successful_downloads, failed_downloads, dict(downloads.video_downloader.outputs),
+                     Metrics.snapshot() if config.collect_metrics else None,
+                     dict(StreamHandler.merge_counts), dict(app.transcoder.counts)))
+        Metrics.close()
+
+class ShardCoordinator:
+    """Spreads a batch's videos over worker processes and combines their results.
+
+    The coordinator lists playlists and channels and hands each video URL, once,
+    to a shared queue. Every shard is a separate process with its own
+    VideoDownloader, worker threads and ffmpeg pool, pulling the next URL when a
+    thread is free, so a slow shard never holds up videos others could take.
+    Shards split the run's bandwidth, disk budget, free space and request rate
+    between them. Every URL handed out is tracked until a shard reports its
+    result, so videos lost with a crashed shard are listed and counted as failed.
+    """
+
+    def __init__(self, config: DownloadConfig, processes: int):
+        self.config = config
+        self.processes = max(1, processes)
+        self.listed = 0
+        self.listing_done = False
+        # URLs handed to the shards that haven't reported a final result yet
+        self.outstanding: Counter[str] = Counter()
+        self._outstanding_lock = threading.Lock()
+        self._stopping = threading.Event()
+        # Video IDs per playlist, in listing order, for the playlist files
+        self.playlists: dict[str, list[str]] = {}
+        self._channel_of: dict[str, str] = {}
+        self._finished_channels: set[str] = set()
+
+    def _shard_config(self) -> DownloadConfig:
+        """The run's configuration divided between the shards"""
+        shard_config = copy.copy(self.config)
+        shard_config.processes = 1
+        # The coordinator applies max_items while listing and builds the ZIP once every shard is done
+        shard_config.max_items = 0
+        shard_config.create_zip = False
+        shard_config.bandwidth_limit = self.config.bandwidth_limit // self.processes
+        shard_config.disk_budget = self.config.disk_budget // self.processes
+        shard_config.requests_per_second = self.config.requests_per_second / self.processes
+        shard_config.transcode_workers = self.config.transcode_workers or max(1, (os.cpu_count() or 1) // self.processes)
+        return shard_config
+
+    def _listing(self, sources: list[tuple[str, str]]):
+        """Yield every video URL the sources lead to, each video once.
+
+        A channel's uploads are followed by the playlists on its home tab, as in an unsharded run.
+        """
+        from pytubefix import Channel, Playlist
+        seen: set[str] = set()
+        for download_type, url in sources:
+            if download_type == 'single':
+                yield from self._list_videos([url], url, seen)
+                continue
+            try:
+                source = Playlist(url) if download_type == 'playlist' else Channel(url)
+                title = source.title if download_type == 'playlist' else None
+                video_urls = islice(source.url_generator(), self.config.max_items or None)
+            except Exception as e:
+                UIHandler.print_error(f"Couldn't list {url}: {str(e)}")
+                continue
+            channel_url = url if download_type == 'channel' else None
+            yield from self._list_videos(video_urls, url, seen, title, channel_url)
+            if download_type == 'channel':
+                yield from self._list_channel_playlists(source, url, seen)
+
+    def _list_channel_playlists(self, channel, url: str, seen: set[str]):
+        """Yield the videos of the playlists on a channel's home tab not seen yet"""
+        from pytubefix import Playlist
+        try:
+            playlists = [item for item in channel.home if isinstance(item, Playlist)]
+        except Exception as e:
+            UIHandler.print_error(f"Couldn't list the playlists of {url}: {str(e)}")
+            return
+        for playlist in playlists:
+            try:
+                title = playlist.title
+                video_urls = islice(playlist.url_generator(), self.config.max_items or None)
+            except Exception as e:
+                UIHandler.print_error(f"Couldn't list a playlist of {url}: {str(e)}")
+                continue
+            UIHandler.print_info(f"Found playlist: {title}")
+            yield from self._list_videos(video_urls, title, seen, title)
+
+    def _list_videos(self, video_urls, name: str, seen: set[str], title: str | None = None,
+                     channel_url: str | None = None):
+        """Yield the URLs of one listing not seen yet, noting playlist members and channel uploads"""
+        members = self.playlists.setdefault(title, []) if title is not None else None
+        try:
+            for video_url in video_urls:
+                # Channels list newest first; a shard found a video before the cutoff
+                if channel_url is not None and channel_url in self._finished_channels:
+                    break
+                video_id = VideoDownloader.get_video_id(video_url)
+                if members is not None and video_id is not None:
+                    members.append(video_id)
+                if video_id is not None and video_id in seen:
+                    continue
+                seen.add(video_id)
+                if channel_url is not None:
+                    self._channel_of[video_url] = channel_url
+                yield video_url
+        except Exception as e:
+            UIHandler.print_error(f"Stopped listing {name}: {str(e)}")
+
+    def _put(self, tasks, item) -> bool:
+        """Queue item for the shards, giving up once every shard has gone"""
+        while not self._stopping.is_set():
+            try:
+                tasks.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _feed(self, sources: list[tuple[str, str]], tasks):
+        for video_url in self._listing(sources):
+            with self._outstanding_lock:
+                self.outstanding[video_url] += 1
+            if not self._put(tasks, video_url):
+                return
+            self.listed += 1
+        self.listing_done = True
+        UIHandler.print_info(f"Listing complete: {self.listed} videos for {self.processes} shards")
+        for _ in range(self.processes):
+            self._put(tasks, None)
+
+    def run(self, sources: list[tuple[str, str]], dir_path: Path) -> dict:
+        """Download every video the sources lead to across the shards and return the combined counts"""
+        started = time.perf_counter()
+        context = multiprocessing.get_context('spawn')
+        # Bounded, so listing stays only a little ahead of the downloads
+        tasks = context.Queue(maxsize=self.processes * self.config.max_workers * 2)
+        results = context.Queue()
+        shard_config = self._shard_config()
+        shards = [
+            context.Process(target=run_shard, args=(shard, self.processes, shard_config, dir_path, tasks, results),
+                            name=f"shard-{shard}")
+            for shard in range(self.processes)
+        ]
+        for process in shards:
+            process.start()
+        UIHandler.print_info(f"Downloading with {self.processes} processes x {self.config.max_workers} workers")
+        feeder = threading.Thread(target=self._feed, args=(sources, tasks), name="shard-feeder", daemon=True)
+        feeder.start()
+
+        summaries: dict[int, tuple] = {}
+        # Final results per shard as reported video by video, which survive a shard crashing
+        reported = {shard: {'succeeded': 0, 'failed': 0} for shard in range(self.processes)}
+        finished = 0
+        running = set(range(self.processes))
+        while running:
+            try:
+                message = results.get(timeout=1)
+            except queue.Empty:
+                for shard in list(running):
+                    if not shards[shard].is_alive():
+                        UIHandler.print_error(f"Shard {shard} exited unexpectedly (code {shards[shard].exitcode})")
+                        running.discard(shard)
+                continue
+            if message[0] == 'video':
+                _, shard, url, succeeded, too_old = message
+                with self._outstanding_lock:
+                    self.outstanding[url] -= 1
+                if not too_old:
+                    reported[shard]['succeeded' if succeeded else 'failed'] += 1
+                if too_old and url in self._channel_of:
+                    self._finished_channels.add(self._channel_of[url])
+                elif succeeded:
+                    finished += 1
+                    total = self.listed if self.listing_done else '?'
+                    UIHandler.print_info(f"[{finished}/{total}] Shard {shard} finished {url}")
+            else:
+                summaries[message[1]] = message[2:]
+                running.discard(message[1])
+        self._stopping.set()
+        for process in shards:
+            process.join()
+        feeder.join()
+
+        outputs: dict[str, Path] = {}
+        converted: Counter[str] = Counter()
+        for _, _, shard_outputs, metrics, merge_counts, convert_counts in summaries.values():
+            outputs.update(shard_outputs)
+            if metrics is not None:
+                Metrics.merge(metrics)
+            StreamHandler.add_merge_counts(merge_counts)
+            converted.update(convert_counts)
+        # Handed out but never reported: taken by a shard that crashed, or still queued when all had gone
+        lost = [url for url, count in self.outstanding.items() for _ in range(count)]
+        for title, video_ids in self.playlists.items():
+            entries = [outputs[video_id] for video_id in dict.fromkeys(video_ids) if video_id in outputs]
+            if entries:
+                FileManager.write_playlist(dir_path, title, entries)
+
+        # A shard's own summary also accounts for merges that failed after the download
+        shard_counts = {
+            shard: {'succeeded': summaries[shard][0], 'failed': summaries[shard][1]} if shard in summaries else counts
+            for shard, counts in reported.items()
+        }
+        summary = {
+            'shards': shard_counts,
+            'succeeded': sum(counts['succeeded'] for counts in shard_counts.values()),
+            'failed': sum(counts['failed'] for counts in shard_counts.values()) + len(lost),
+            'crashed': [shard for shard in range(self.processes) if shard not in summaries],
+            'lost': lost,
+            'outputs': outputs,
+            'converted': dict(converted),
+            'seconds': time.perf_counter() - started,
+        }
+        self.print_summary(summary)
+        return summary
+
+    @staticmethod
+    def print_summary(summary: dict):
+        """Print the combined results of every shard"""
+        UIHandler.print_section_header("SHARDED DOWNLOAD SUMMARY")
+        for shard, counts in summary['shards'].items():
+            print(f"Shard {shard}: {counts['succeeded']} downloaded, {counts['failed']} failed")
+        UIHandler.print_success(f"Successfully downloaded: {summary['succeeded']} videos in {summary['seconds']:.1f}s")
+        if summary['failed'] > 0:
+            UIHandler.print_error(f"Failed downloads: {summary['failed']} videos")
+        if summary['crashed']:
+            UIHandler.print_error(f"Shards that exited without reporting: {', '.join(map(str, summary['crashed']))}")
+        if summary['lost']:
+            UIHandler.print_error(f"{len(summary['lost'])} videos never reported back and count as failed:")
+            for url in summary['lost']:
+                print(f"  {url}")
\ No newline at end of file
@@ -0,0 +1,75 @@
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+class InsufficientStorageError(Exception):
+    """A download can't fit within the free space or disk budget"""
+
+class StoragePlanner:
+    """Admits downloads only while projected disk usage stays under the limits.
+
+    Each video reserves its expected peak footprint before transferring. A video
+    that doesn't fit waits for in-flight work to release space while other
+    workers carry on with videos that do fit, and is refused outright if it
+    could never fit. Limits are a minimum amount of free space to leave on the
+    volume and an optional budget for everything this run writes.
+    """
+
+    def __init__(self, dir_path: Path, budget: int = 0, min_free: int = 256 * 1024 * 1024):
+        self.dir_path = dir_path
+        self.budget = budget  # bytes this run may keep on disk, 0 for no limit
+        self.min_free = min_free
+        self.reserved = 0
+        self.committed = 0  # bytes of finished outputs
+        # Processes reserving on the same volume; each may only use its share of the free space
+        self.shares = 1
+        self._condition = threading.Condition()
+
+    @staticmethod
+    def estimate(streams: list, converts: bool = False, archives: bool = False) -> int:
+        """Peak bytes a download needs while it is in progress.
+
+        Merging, converting and archiving each write a full copy before the
+        previous one is deleted, so any of them doubles the source size.
+        """
+        source = sum(stream.filesize or 0 for stream in streams)
+        return source * 2 if len(streams) > 1 or converts or archives else source
+
+    def _shortfall(self, need: int) -> int:
+        """Bytes missing for need to fit right now, 0 if it fits"""
+        free = (shutil.disk_usage(self.dir_path).free - self.min_free) // self.shares - self.reserved
+        missing = need - free
+        if self.budget:
+            missing = max(missing, self.committed + self.reserved + need - self.budget)
+        return max(0, missing)
+
+    def check(self, need: int) -> int:
+        """Bytes missing for need to fit alongside current reservations, 0 if it fits"""
+        with self._condition:
+            return self._shortfall(need)
+
+    @contextmanager
+    def reserve(self, need: int):
+        """Hold need bytes for the block, waiting for other downloads to free space if necessary"""
+        with self._condition:
+            while (missing := self._shortfall(need)) > 0:
+                if not self.reserved:
+                    # Nothing in flight will free anything up
+                    raise InsufficientStorageError(
+                        f"needs {need / (1024 * 1024):.0f} MB, {missing / (1024 * 1024):.0f} MB short "
+                        f"of the free space or disk budget"
+                    )
+                self._condition.wait(5)
+            self.reserved += need
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.reserved -= need
+                self._condition.notify_all()
+
+    def record_output(self, file_path: Path):
+        """Count a finished output against the run's budget"""
+        with self._condition:
+            self.committed += file_path.stat().st_size
\ No newline at end of file
@@ -0,0 +1,242 @@
+import http.client
+import json
+import math
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator
+from urllib.error import HTTPError, URLError
+from urllib.parse import urljoin, urlsplit
+
+class StreamFetcher:
+    """Fetch stream URLs with HTTP Range requests.
+
+    Downloads are written to '<output>.part' and renamed once complete. Resumable
+    fetches also keep a '<output>.part.json' sidecar with the bytes safely on disk,
+    and segmented fetches split one stream across several kept-alive connections.
+    """
+    RANGE_SIZE = 9 * 1024 * 1024  # same window pytubefix requests
+    CHUNK_SIZE = 64 * 1024
+    MAX_REDIRECTS = 5
+    HEADERS = {"User-Agent": "Mozilla/5.0", "accept-language": "en-US,en"}
+    # Folder beside the run folders where resumable partial streams are kept between runs
+    PARTIAL_DIR_NAME = ".partial"
+    RETRYABLE_ERRORS = (URLError, ConnectionError, TimeoutError, socket.timeout, http.client.HTTPException)
+
+    @staticmethod
+    def part_paths(output_path: Path) -> tuple[Path, Path]:
+        """Return the (.part, .part.json) paths used while output_path is incomplete"""
+        part_path = output_path.with_name(output_path.name + '.part')
+        return part_path, part_path.with_name(part_path.name + '.json')
+
+    @staticmethod
+    def resume_offset(part_path: Path, total_size: int, stream_id: str) -> int:
+        """Return how many bytes of a previous attempt at part_path can be reused"""
+        sidecar_path = part_path.with_name(part_path.name + '.json')
+        try:
+            progress = json.loads(sidecar_path.read_text())
+        except (OSError, ValueError):
+            return 0
+        if progress.get('stream_id') != stream_id or progress.get('total_size') != total_size:
+            return 0
+        if not part_path.exists():
+            return 0
+        return min(progress.get('received', 0), part_path.stat().st_size, total_size)
+
+    @staticmethod
+    def _save_progress(sidecar_path: Path, stream_id: str, total_size: int, received: int):
+        sidecar_path.write_text(json.dumps({'stream_id': stream_id, 'total_size': total_size, 'received': received}))
+
+    @staticmethod
+    def _connect(url: str, timeout: float) -> tuple[http.client.HTTPConnection, str]:
+        """Open a connection to the host of url and return it with the request target"""
+        parts = urlsplit(url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        target = parts.path or '/'
+        if parts.query:
+            target += f"?{parts.query}"
+        return connection_class(parts.netloc, timeout=timeout), target
+
+    @staticmethod
+    def _iter_range(url: str, start: int, end: int,
+                    on_checkpoint: Callable[[int], None] | None = None,
+                    stop: threading.Event | None = None,
+                    max_retries: int = 5, timeout: float = 30) -> Iterator[tuple[int, bytes]]:
+        """Yield (offset, chunk) pairs covering bytes start..end (inclusive) of url.
+
+        Requests go out in RANGE_SIZE windows over one kept-alive connection. A dropped
+        connection or server error is retried from the last byte yielded, and
+        on_checkpoint is told the offset reached after every window or failure, by
+        which point the caller has handled every chunk yielded before it. A server
+        that ignores Range starts again from offset 0.
+        """
+        connection = None
+        position = start
+        failures = 0
+        redirects = 0
+        try:
+            while position <= end:
+                if stop is not None and stop.is_set():
+                    return
+                window_start = position
+                window_end = min(position + StreamFetcher.RANGE_SIZE - 1, end)
+                try:
+                    if connection is None:
+                        connection, target = StreamFetcher._connect(url, timeout)
+                    connection.request('GET', target, headers={
+                        **StreamFetcher.HEADERS, 'Range': f"bytes={position}-{window_end}"
+                    })
+                    response = connection.getresponse()
+
+                    if response.status in (301, 302, 303, 307, 308) and redirects < StreamFetcher.MAX_REDIRECTS:
+                        response.read()
+                        connection.close()
+                        connection = None
+                        url = urljoin(url, response.getheader('Location'))
+                        redirects += 1
+                        continue
+                    if response.status == 200:
+                        # Server ignored the Range header and sent the whole file
+                        position = window_start = 0
+                    elif response.status != 206:
+                        response.read()
+                        raise HTTPError(url, response.status, response.reason, response.headers, None)
+
+                    while chunk := response.read(StreamFetcher.CHUNK_SIZE):
+                        yield position, chunk
+                        position += len(chunk)
+                    if position == window_start:
+                        raise ConnectionError(f"No data received for bytes {window_start}-{window_end}")
+                    failures = 0
+                except HTTPError as e:
+                    # Client errors won't fix themselves; only server errors are worth retrying
+                    failures += 1
+                    if e.code < 500 or failures > max_retries:
+                        raise
+                    time.sleep(min(2 ** failures, 30))
+                except StreamFetcher.RETRYABLE_ERRORS:
+                    failures += 1
+                    if connection is not None:
+                        connection.close()
+                        connection = None
+                    if failures > max_retries:
+                        raise
+                    time.sleep(min(2 ** failures, 30))
+                finally:
+                    if on_checkpoint is not None:
+                        on_checkpoint(position)
+        finally:
+            if connection is not None:
+                connection.close()
+
+    @staticmethod
+    def _fetch_range(url: str, file_path: Path, start: int, end: int,
+                     on_progress: Callable[[int], None] | None = None,
+                     on_checkpoint: Callable[[int], None] | None = None,
+                     stop: threading.Event | None = None,
+                     max_retries: int = 5, timeout: float = 30):
+        """Fetch bytes start..end (inclusive) of url into the same offsets of file_path"""
+        with open(file_path, 'r+b') as file:
+            def checkpoint(position: int):
+                file.flush()
+                if on_checkpoint is not None:
+                    on_checkpoint(position)
+
+            next_offset = None
+            for offset, chunk in StreamFetcher._iter_range(url, start, end, checkpoint, stop, max_retries, timeout):
+                if offset != next_offset:
+                    file.seek(offset)
+                file.write(chunk)
+                next_offset = offset + len(chunk)
+                if on_progress is not None:
+                    on_progress(len(chunk))
+
+    @staticmethod
+    def iter_stream(url: str, total_size: int, on_progress: Callable[[int], None] | None = None,
+                    max_retries: int = 5, timeout: float = 30) -> Iterator[bytes]:
+        """Yield the bytes of url strictly in order, for consumers that can't seek such as a pipe.
+
+        Retries continue where the last chunk ended; bytes a server resends after
+        ignoring Range are dropped instead of being yielded twice.
+        """
+        delivered = 0
+        for offset, chunk in StreamFetcher._iter_range(url, 0, total_size - 1, max_retries=max_retries, timeout=timeout):
+            if offset + len(chunk) <= delivered:
+                continue
+            if offset < delivered:
+                chunk = chunk[delivered - offset:]
+            delivered += len(chunk)
+            if on_progress is not None:
+                on_progress(len(chunk))
+            yield chunk
+
+    @staticmethod
+    def fetch_resumable(url: str, output_path: Path, total_size: int, stream_id: str,
+                        on_progress: Callable[[int], None] | None = None,
+                        max_retries: int = 5, timeout: float = 30, part_path: Path | None = None,
+                        on_resume: Callable[[int], None] | None = None) -> Path:
+        """Download url to output_path, continuing from any earlier partial attempt.
+
+        The partial file is kept at part_path, or beside output_path by default; a
+        part_path outside the run folder lets a later run pick it up. on_progress is
+        called with the byte count of every chunk received from the network, and
+        on_resume once up front with the number of bytes recovered from a previous attempt.
+        """
+        if part_path is None:
+            part_path, sidecar_path = StreamFetcher.part_paths(output_path)
+        else:
+            sidecar_path = part_path.with_name(part_path.name + '.json')
+        received = StreamFetcher.resume_offset(part_path, total_size, stream_id)
+
+        with open(part_path, 'r+b' if received else 'wb') as part_file:
+            # Drop anything written after the last recorded checkpoint
+            part_file.truncate(received)
+        if received and on_resume is not None:
+            on_resume(received)
+
+        StreamFetcher._fetch_range(
+            url, part_path, received, total_size - 1, on_progress,
+            on_checkpoint=lambda position: StreamFetcher._save_progress(sidecar_path, stream_id, total_size, position),
+            max_retries=max_retries, timeout=timeout
+        )
+
+        part_path.replace(output_path)
+        sidecar_path.unlink(missing_ok=True)
+        return output_path
+
+    @staticmethod
+    def fetch_segmented(url: str, output_path: Path, total_size: int, segments: int,
+                        on_progress: Callable[[int], None] | None = None,
+                        max_retries: int = 5, timeout: float = 30) -> Path:
+        """Download url over several connections, each filling its own slice of a preallocated file"""
+        part_path, _ = StreamFetcher.part_paths(output_path)
+        with open(part_path, 'wb') as part_file:
+            part_file.truncate(total_size)
+
+        segment_size = math.ceil(total_size / max(1, segments))
+        bounds = [(start, min(start + segment_size, total_size) - 1) for start in range(0, total_size, segment_size)]
+
+        # One failed segment stops the others instead of letting them finish a file we will discard
+        stop = threading.Event()
+
+        def fetch_segment(segment: tuple[int, int]):
+            try:
+                StreamFetcher._fetch_range(url, part_path, *segment, on_progress,
+                                           stop=stop, max_retries=max_retries, timeout=timeout)
+            except Exception:
+                stop.set()
+                raise
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(bounds)) as executor:
+                futures = [executor.submit(fetch_segment, segment) for segment in bounds]
+            for future in futures:
+                future.result()
+        except Exception:
+            part_path.unlink(missing_ok=True)
+            raise
+
+        part_path.replace(output_path)
+        return output_path
\ No newline at end of file
@@ -1,116 +1,256 @@
-from pytubefix import YouTube
+import threading
+from typing import TYPE_CHECKING
 from config import FileType
 from pathlib import Path
-from ffmpeg import FFmpeg, Progress
-from tqdm import tqdm
+from metrics import Metrics
+from transcoder import AUDIO_ENCODERS, CONTAINER_CODECS, ffmpeg_tools_available, plan_conversion, probe_codecs
+from ui_handler import UIHandler
+
+if TYPE_CHECKING:
+    from pytubefix import YouTube
+
+class StreamIndex:
+    """Index of a video's streams built in a single pass over yt.streams.
+
+    Every selection fallback in StreamHandler is answered from these lookups
+    instead of re-filtering the full stream list.
+    """
+
+    def __init__(self, streams):
+        # (subtype, resolution) -> first matching stream, mirroring StreamQuery.first()
+        self.progressive: dict[tuple[str, str], object] = {}
+        self.adaptive_video: dict[tuple[str, str], object] = {}
+        # resolution -> adaptive video-only streams in listing order
+        self.adaptive_video_by_resolution: dict[str, list] = {}
+        # subtype -> highest bitrate audio-only stream
+        self.audio_by_subtype: dict[str, object] = {}
+        self.best_audio = None
+        audio_bitrates: dict[str, int] = {}
+        best_audio_bitrate = -1
+
+        for stream in streams:
+            if stream.is_progressive:
+                self.progressive.setdefault((stream.subtype, stream.resolution), stream)
+            elif stream.includes_video_track:
+                if stream.resolution is None:
+                    continue
+                self.adaptive_video.setdefault((stream.subtype, stream.resolution), stream)
+                self.adaptive_video_by_resolution.setdefault(stream.resolution, []).append(stream)
+            elif stream.abr is not None:
+                bitrate = self.parse_number(stream.abr)
+                # >= keeps the last of equal bitrates, as order_by('abr') followed by last() does
+                if bitrate >= audio_bitrates.get(stream.subtype, -1):
+                    audio_bitrates[stream.subtype] = bitrate
+                    self.audio_by_subtype[stream.subtype] = stream
+                if bitrate >= best_audio_bitrate:
+                    best_audio_bitrate = bitrate
+                    self.best_audio = stream
+
+    @staticmethod
+    def parse_number(value: str | None) -> int:
+        """Turn strings such as '1080p' or '128kbps' into integers"""
+        digits = ''.join(filter(str.isdigit, value or ''))
+        return int(digits) if digits else 0
+
+    def closest_video(self, resolution: str, target_extension: str):
+        """Return the adaptive video stream nearest to resolution.
+
+        The highest resolution at or below the request wins; if there is none, the
+        lowest one above it. Within a resolution the requested extension is preferred.
+        """
+        if not self.adaptive_video_by_resolution:
+            return None
+        target = self.parse_number(resolution) or float('inf')
+
+        def rank(candidate: str):
+            value = self.parse_number(candidate)
+            return value > target, abs(value - target)
+
+        streams = self.adaptive_video_by_resolution[min(self.adaptive_video_by_resolution, key=rank)]
+        for stream in streams:
+            if stream.subtype == target_extension:
+                return stream
+        return streams[0]
 
 class StreamHandler:
+    # How many merges copied both tracks, had to re-encode one, or failed
+    merge_counts = {'stream copy': 0, 'audio re-encode': 0, 'video re-encode': 0, 'failed': 0}
+    _merge_lock = threading.Lock()
+
     @staticmethod
-    def get_audio_stream(yt: YouTube, target_extension: str):
+    def get_audio_stream(yt: 'YouTube', target_extension: str, index: StreamIndex | None = None):
         """Get the highest quality audio stream available"""
-        stream = yt.streams.get_audio_only(target_extension)
+        index = index or StreamIndex(yt.streams)
+        stream = index.audio_by_subtype.get(target_extension)
         if stream:
             return stream
         else:
             print(f"No {target_extension} audio streams available. Choosing the next best option.")
-            return yt.streams.get_audio_only()
+            return index.audio_by_subtype.get('mp4') or index.best_audio
 
     @staticmethod
-    def get_video_stream(yt: YouTube, target_extension: str, resolution: str):
+    def get_video_stream(yt: 'YouTube', target_extension: str, resolution: str, index: StreamIndex | None = None):
         """Get video stream for specified resolution and extension"""
+        index = index or StreamIndex(yt.streams)
+
         # First try to get progressive stream (video + audio combined)
-        progressive_stream = yt.streams.filter(
-            file_extension=target_extension, 
-            progressive=True, 
-            resolution=resolution
-        ).first()
+        progressive_stream = index.progressive.get((target_extension, resolution))
         
         if progressive_stream:
             return progressive_stream, None
         
         # If no progressive stream, get adaptive streams (video only + audio only)
-        video_stream = yt.streams.filter(
-            adaptive=True,
-            file_extension=target_extension,
-            resolution=resolution,
-            only_video=True
-        ).first()
+        video_stream = index.adaptive_video.get((target_extension, resolution))
         
-        if not video_stream:
+        if not video_stream and index.adaptive_video_by_resolution.get(resolution):
             # Try without file extension restriction
-            video_stream = yt.streams.filter(
-                adaptive=True,
-                resolution=resolution,
-                only_video=True
-            ).first()
+            video_stream = index.adaptive_video_by_resolution[resolution][0]
         
         if not video_stream:
-            # Fall back to highest available resolution
-            print(f"Resolution {resolution} not available. Getting highest quality available.")
-            video_stream = yt.streams.filter(adaptive=True, only_video=True).order_by('resolution').desc().first()
+            # Fall back to the nearest resolution available
+            video_stream = index.closest_video(resolution, target_extension)
+            if video_stream:
+                print(f"Resolution {resolution} not available. Using closest available: {video_stream.resolution}.")
         
         # Get audio stream
-        audio_stream = yt.streams.filter(adaptive=True, only_audio=True).order_by('abr').desc().first()
+        audio_stream = index.best_audio
         
         return video_stream, audio_stream
 
     @staticmethod
-    def get_stream(yt: YouTube, file_type: FileType, target_extension: str, resolution: str = ""):
+    def get_stream(yt: 'YouTube', file_type: FileType, target_extension: str, resolution: str = ""):
         """Get appropriate stream based on file type"""
-        if file_type == FileType.VIDEO:
-            return StreamHandler.get_video_stream(yt, target_extension, resolution)
-        elif file_type == FileType.AUDIO:
-            return StreamHandler.get_audio_stream(yt, target_extension), None
+        with Metrics.phase("stream_selection"):
+            # yt.streams re-checks availability on every access, so read it once
+            index = StreamIndex(yt.streams)
+            if file_type == FileType.VIDEO:
+                return StreamHandler.get_video_stream(yt, target_extension, resolution, index)
+            elif file_type == FileType.AUDIO:
+                return StreamHandler.get_audio_stream(yt, target_extension, index), None
+
+    @staticmethod
+    def plan_merge(video_path: Path, audio_path: Path, output_path: Path,
+                   video_codec: str | None = None, audio_codec: str | None = None) -> tuple[dict, str]:
+        """Return ffmpeg output options for a merge and the path it takes.
+
+        Codecs not known from the stream metadata are probed before planning.
+        """
+        if (video_codec is None or audio_codec is None) and ffmpeg_tools_available():
+            try:
+                video_codec = video_codec or probe_codecs(video_path)[0]
+                audio_codec = audio_codec or probe_codecs(audio_path)[1]
+            except Exception as e:
+                print(f"Couldn't probe streams before merging: {str(e)}")
+        return StreamHandler.merge_options(video_codec, audio_codec, output_path.suffix.lstrip('.').lower())
 
     @staticmethod
-    def merge_video_audio(video_path: Path, audio_path: Path, output_path: Path, file_seconds: int) -> bool:
-        """Merge video and audio files using ffmpeg-python"""
-        try:
-            # Initialize progress bar
-            progress_bar = tqdm(
-                total=100,  # Percentage scale (0-100)
-                unit='%',
-                bar_format='{l_bar}{bar}| {n:.0f}% [{elapsed}<{remaining}]'
-            )
+    def merge_options(video_codec: str | None, audio_codec: str | None, target_extension: str) -> tuple[dict, str]:
+        """Plan a merge from known codecs, stream-copying each track the target container can hold.
+
+        An unknown video codec is still copied, and an unknown audio codec is
+        re-encoded unless the container takes anything.
+        """
+        options = plan_conversion(video_codec, audio_codec, target_extension)
+        if video_codec is None:
+            options['c:v'] = 'copy'
+        if audio_codec is None:
+            # Containers that take any codec can still copy a track we couldn't identify
+            if CONTAINER_CODECS[target_extension][1] is None:
+                options['c:a'] = 'copy'
+            else:
+                options.update(AUDIO_ENCODERS[target_extension])
+
+        if options['c:v'] != 'copy':
+            return options, 'video re-encode'
+        return options, 'stream copy' if options['c:a'] == 'copy' else 'audio re-encode'
+
+    @staticmethod
+    def print_merge_summary():
+        """Report how many merges took each path since the last summary"""
+        with StreamHandler._merge_lock:
+            counts = dict(StreamHandler.merge_counts)
+            StreamHandler.merge_counts = dict.fromkeys(counts, 0)
+        merged = sum(counts.values())
+        if merged:
+            parts = ', '.join(f"{count} {mode}" for mode, count in counts.items() if count)
+            UIHandler.print_info(f"Merged {merged} videos: {parts}")
+
+    @staticmethod
+    def add_merge_counts(counts: dict[str, int]):
+        """Add merges counted by another process, such as a download shard"""
+        with StreamHandler._merge_lock:
+            for mode, count in counts.items():
+                StreamHandler.merge_counts[mode] = StreamHandler.merge_counts.get(mode, 0) + count
+
+    @staticmethod
+    def _count_merge(mode: str):
+        with StreamHandler._merge_lock:
+            StreamHandler.merge_counts[mode] += 1
+
+    @staticmethod
+    def merge_video_audio(video_path: Path, audio_path: Path, output_path: Path, file_seconds: int,
+                          video_codec: str | None = None, audio_codec: str | None = None) -> bool:
+        """Merge video and audio files with ffmpeg, stream-copying every track the container supports"""
+        input_bytes = sum(path.stat().st_size for path in (video_path, audio_path) if path.is_file())
+        with Metrics.phase("merge", bytes=input_bytes) as timing:
+            try:
+                # Only adaptive video downloads merge, so other runs never load these
+                from ffmpeg import FFmpeg, Progress
+                from tqdm import tqdm
+                options, mode = StreamHandler.plan_merge(video_path, audio_path, output_path, video_codec, audio_codec)
+                timing['mode'] = mode
+
+                # Initialize progress bar
+                progress_bar = tqdm(
+                    total=100,  # Percentage scale (0-100)
+                    unit='%',
+                    bar_format='{l_bar}{bar}| {n:.0f}% [{elapsed}<{remaining}]'
+                )
             
-            last_progress = 0
-
-            def on_progress(progress: Progress):
-                """Update progress bar based on time progress"""
-                nonlocal last_progress
-                try:
-                    # current progress (0-1)
-                    current_progress = min(progress.time.total_seconds() / float(file_seconds), 1.0)
-                    current_percent = current_progress * 100
-                    progress_bar.update(current_percent - last_progress)
-                    last_progress = current_percent
-                except Exception as e:
-                    print(f"Progress error: {str(e)}")
-
-            ffmpeg = (
-                FFmpeg()
-                .input(str(video_path))
-                .input(str(audio_path))
-                .output(str(output_path), vcodec='copy', acodec='aac')
-            )
-
-            ffmpeg.on("progress", on_progress)
-            ffmpeg.execute()
-
-            if last_progress < 100:
-                progress_bar.update(100 - last_progress)
+                last_progress = 0
+
+                def on_progress(progress: Progress):
+                    """Update progress bar based on time progress"""
+                    nonlocal last_progress
+                    try:
+                        # current progress (0-1)
+                        current_progress = min(progress.time.total_seconds() / float(file_seconds), 1.0)
+                        current_percent = current_progress * 100
+                        progress_bar.update(current_percent - last_progress)
+                        last_progress = current_percent
+                    except Exception as e:
+                        print(f"Progress error: {str(e)}")
+
+                ffmpeg = (
+                    FFmpeg()
+                    .option('y')
+                    .input(str(video_path))
+                    .input(str(audio_path))
+                    .output(str(output_path), options)
+                )
+
+                ffmpeg.on("progress", on_progress)
+                ffmpeg.execute()
+
+                if last_progress < 100:
+                    progress_bar.update(100 - last_progress)
             
-            progress_bar.close()
-
-            # Clean up temporary files
-            video_path.unlink(missing_ok=True)
-            audio_path.unlink(missing_ok=True)
-
-            return True
-        except FileNotFoundError:
-            print("❌ FFmpeg not found. Please install FFmpeg to merge high-quality video streams.")
-            print("   Keeping separate video and audio files.")
-            return False
-        except Exception as e:
-            print(f"❌ Error merging files: {str(e)}")
-            return False
\ No newline at end of file
+                progress_bar.close()
+                StreamHandler._count_merge(mode)
+
+                # Clean up temporary files
+                video_path.unlink(missing_ok=True)
+                audio_path.unlink(missing_ok=True)
+
+                return True
+            except FileNotFoundError:
+                timing['error'] = "FFmpeg not found"
+                StreamHandler._count_merge('failed')
+                print("❌ FFmpeg not found. Please install FFmpeg to merge high-quality video streams.")
+                print("   Keeping separate video and audio files.")
+                return False
+            except Exception as e:
+                timing['error'] = f"{type(e).__name__}: {e}"
+                StreamHandler._count_merge('failed')
+                print(f"❌ Error merging files: {str(e)}")
+                return False
\ No newline at end of file
@@ -0,0 +1,309 @@
+import functools
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable
+from file_manager import is_temporary
+from ui_handler import UIHandler
+from metrics import Metrics
+
+# Codecs each output container can hold without re-encoding. None means anything goes.
+CONTAINER_CODECS: dict[str, tuple[set | None, set | None]] = {
+    'mp4': ({'h264', 'hevc', 'av1', 'vp9', 'mpeg4'}, {'aac', 'mp3', 'opus', 'alac', 'flac', 'ac3', 'eac3'}),
+    'mov': ({'h264', 'hevc', 'mpeg4', 'prores'}, {'aac', 'alac', 'mp3', 'pcm_s16le'}),
+    'mkv': (None, None),
+    'webm': ({'vp8', 'vp9', 'av1'}, {'opus', 'vorbis'}),
+    'avi': ({'mpeg4', 'h264', 'mjpeg'}, {'mp3', 'ac3', 'pcm_s16le'}),
+    'wmv': ({'wmv1', 'wmv2'}, {'wmav1', 'wmav2'}),
+    'mp3': (set(), {'mp3'}),
+    'wav': (set(), {'pcm_s16le', 'pcm_s24le', 'pcm_f32le'}),
+    'aac': (set(), {'aac'}),
+    'ogg': (set(), {'vorbis', 'opus', 'flac'}),
+    'wma': (set(), {'wmav1', 'wmav2'}),
+    'flac': (set(), {'flac'}),
+    'm4a': (set(), {'aac', 'alac'}),
+}
+
+# Encoder settings used when a track has to be re-encoded for a container
+VIDEO_ENCODERS = {
+    'mp4': {'c:v': 'libx264', 'preset': 'veryfast', 'crf': 20},
+    'mov': {'c:v': 'libx264', 'preset': 'veryfast', 'crf': 20},
+    'mkv': {'c:v': 'libx264', 'preset': 'veryfast', 'crf': 20},
+    'webm': {'c:v': 'libvpx-vp9', 'crf': 32, 'b:v': 0, 'row-mt': 1},
+    'avi': {'c:v': 'mpeg4', 'q:v': 3},
+    'wmv': {'c:v': 'wmv2', 'q:v': 3},
+}
+AUDIO_ENCODERS = {
+    'mp4': {'c:a': 'aac', 'b:a': '192k'},
+    'mov': {'c:a': 'aac', 'b:a': '192k'},
+    'mkv': {'c:a': 'aac', 'b:a': '192k'},
+    'webm': {'c:a': 'libopus', 'b:a': '160k'},
+    'avi': {'c:a': 'libmp3lame', 'b:a': '192k'},
+    'wmv': {'c:a': 'wmav2', 'b:a': '192k'},
+    'mp3': {'c:a': 'libmp3lame', 'q:a': 2},
+    'wav': {'c:a': 'pcm_s16le'},
+    'aac': {'c:a': 'aac', 'b:a': '192k'},
+    'ogg': {'c:a': 'libvorbis', 'q:a': 6},
+    'wma': {'c:a': 'wmav2', 'b:a': '192k'},
+    'flac': {'c:a': 'flac'},
+    'm4a': {'c:a': 'aac', 'b:a': '192k'},
+}
+
+# Prefixes of the codec strings in YouTube stream MIME types, mapped to ffmpeg codec names
+STREAM_AUDIO_CODECS = {'mp4a': 'aac', 'opus': 'opus', 'vorbis': 'vorbis', 'ac-3': 'ac3', 'ec-3': 'eac3'}
+STREAM_VIDEO_CODECS = {'avc1': 'h264', 'avc3': 'h264', 'vp9': 'vp9', 'vp09': 'vp9', 'vp8': 'vp8',
+                       'av01': 'av1', 'hev1': 'hevc', 'hvc1': 'hevc'}
+
+@functools.cache
+def ffmpeg_tools_available() -> bool:
+    """Whether ffmpeg and ffprobe are on PATH, looked up once per process"""
+    return shutil.which('ffmpeg') is not None and shutil.which('ffprobe') is not None
+
+def stream_audio_codec(codec_string: str | None) -> str | None:
+    """Translate a stream's audio codec string, e.g. 'mp4a.40.2', into the ffmpeg codec name"""
+    if not codec_string:
+        return None
+    return STREAM_AUDIO_CODECS.get(codec_string.split('.')[0].lower())
+
+def stream_video_codec(codec_string: str | None) -> str | None:
+    """Translate a stream's video codec string, e.g. 'avc1.640028', into the ffmpeg codec name"""
+    if not codec_string:
+        return None
+    return STREAM_VIDEO_CODECS.get(codec_string.split('.')[0].lower())
+
+class StreamEncodeError(Exception):
+    """ffmpeg couldn't encode a piped stream, e.g. it exited early on input it can't demux from a pipe"""
+
+class ChunkReader(io.RawIOBase):
+    """Read-only file object over an iterator of byte chunks, so a download can be piped to ffmpeg"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._pending = memoryview(b'')
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pending = memoryview(chunk)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+def encode_stream(chunks: Iterable[bytes], audio_codec: str | None, output_path: Path) -> Path:
+    """Feed an audio stream chunk by chunk into ffmpeg and write only the final file.
+
+    Decoding overlaps with the download and no copy of the source container is
+    ever written to disk. The target format comes from output_path's suffix.
+    Raises StreamEncodeError when ffmpeg fails or stops reading its input.
+    """
+    from ffmpeg import FFmpeg, FFmpegError
+    target_extension = output_path.suffix.lstrip('.')
+    options = plan_conversion(None, audio_codec, target_extension)
+    if audio_codec is None:
+        options.update(AUDIO_ENCODERS[target_extension])
+    temp_path = output_path.with_name(f"{output_path.stem}.converting{output_path.suffix}")
+    try:
+        FFmpeg().option('y').input('pipe:0').output(str(temp_path), options).execute(ChunkReader(chunks))
+    except (FFmpegError, BrokenPipeError) as e:
+        # A broken pipe means ffmpeg exited before reading everything, not a network failure
+        temp_path.unlink(missing_ok=True)
+        raise StreamEncodeError(str(e).strip() or type(e).__name__) from e
+    except Exception:
+        temp_path.unlink(missing_ok=True)
+        raise
+    temp_path.replace(output_path)
+    return output_path
+
+def probe_codecs(file_path: Path) -> tuple[str | None, str | None]:
+    """Return the (video, audio) codec names of the first track of each kind"""
+    from ffmpeg import FFmpeg
+    output = FFmpeg(executable="ffprobe").input(
+        str(file_path), print_format="json", show_streams=None, v="error"
+    ).execute()
+    video_codec = audio_codec = None
+    for stream in json.loads(output).get('streams', []):
+        if stream.get('codec_type') == 'video' and video_codec is None and not stream.get('disposition', {}).get('attached_pic'):
+            video_codec = stream.get('codec_name')
+        elif stream.get('codec_type') == 'audio' and audio_codec is None:
+            audio_codec = stream.get('codec_name')
+    return video_codec, audio_codec
+
+def plan_conversion(video_codec: str | None, audio_codec: str | None, target_extension: str) -> dict:
+    """Build ffmpeg output options, copying every track the target container can hold as-is"""
+    allowed_video, allowed_audio = CONTAINER_CODECS[target_extension]
+    options: dict = {'sn': None, 'dn': None}
+
+    if allowed_video is not None and not allowed_video:
+        options['vn'] = None  # audio-only container
+    elif video_codec is not None:
+        if allowed_video is None or video_codec in allowed_video:
+            options['c:v'] = 'copy'
+        else:
+            options.update(VIDEO_ENCODERS[target_extension])
+
+    if audio_codec is not None:
+        if allowed_audio is None or audio_codec in allowed_audio:
+            options['c:a'] = 'copy'
+        else:
+            options.update(AUDIO_ENCODERS[target_extension])
+    return options
+
+def convert_file(source: str, target_extension: str) -> tuple[str, str, int, float]:
+    """Convert one file to target_extension in a worker process.
+
+    Returns (output path, 'unchanged' | 'remux' | 'transcode', input bytes, seconds).
+    """
+    from ffmpeg import FFmpeg
+    started = time.perf_counter()
+    source_path = Path(source)
+    input_bytes = source_path.stat().st_size
+    video_codec, audio_codec = probe_codecs(source_path)
+    options = plan_conversion(video_codec, audio_codec, target_extension)
+    copies_everything = all(options.get(key, 'copy') == 'copy' for key in ('c:v', 'c:a'))
+
+    output_path = source_path.with_suffix(f".{target_extension}")
+    drops_video = 'vn' in options and video_codec is not None
+    if copies_everything and not drops_video and source_path.suffix.lower() == f".{target_extension}":
+        return str(source_path), 'unchanged', input_bytes, time.perf_counter() - started
+
+    temp_path = source_path.with_name(f"{source_path.stem}.converting.{target_extension}")
+    try:
+        FFmpeg().option('y').input(str(source_path)).output(str(temp_path), options).execute()
+    except Exception:
+        temp_path.unlink(missing_ok=True)
+        raise
+    temp_path.replace(output_path)
+    if source_path != output_path:
+        source_path.unlink(missing_ok=True)
+    mode = 'remux' if copies_everything else 'transcode'
+    return str(output_path), mode, input_bytes, time.perf_counter() - started
+
+def _convert_in_worker(source: str, target_extension: str) -> tuple[str, str, int, float]:
+    """convert_file for the process pool, raising errors the parent process can unpickle"""
+    try:
+        return convert_file(source, target_extension)
+    except Exception as e:
+        # FFmpegError can't be rebuilt from its pickle, and a result that fails to unpickle breaks the whole pool
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+
+class Transcoder:
+    """Converts finished downloads into their target container with ffmpeg.
+
+    Jobs run in a process pool sized to the CPU count. Tracks the target container
+    already supports are stream-copied, so most conversions are cheap remuxes.
+    """
+
+    def __init__(self, target_extension: str, max_workers: int | None = None, pool: ProcessPoolExecutor | None = None):
+        self.target_extension = target_extension
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # A pool passed in is shared with other transcoders and left running by close()
+        self._pool: ProcessPoolExecutor | None = pool
+        self._owns_pool = pool is None
+        self._lock = threading.Lock()
+        self._started = None
+        self.counts = {'unchanged': 0, 'remux': 0, 'transcode': 0, 'renamed': 0, 'failed': 0}
+        self.input_bytes = 0
+        self.busy_seconds = 0.0
+        self._converted: set[Path] = set()
+        self.ffmpeg_available = ffmpeg_tools_available()
+        if not self.ffmpeg_available:
+            UIHandler.print_error("FFmpeg not found. Files will only be renamed, not converted.")
+
+    @staticmethod
+    def create_pool(max_workers: int | None = None) -> ProcessPoolExecutor:
+        """Process pool for conversions that is safe to start from any thread.
+
+        Workers are spawned, not forked: the pool starts from download worker
+        threads, and forking a multi-threaded process can deadlock the child.
+        """
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = self.create_pool(self.max_workers)
+                self._owns_pool = True
+            if self._started is None:
+                self._started = time.perf_counter()
+            return self._pool
+
+    def convert(self, file_path: Path) -> Path:
+        """Convert one file, blocking until done, and return the path of the result"""
+        with Metrics.phase("convert") as timing:
+            try:
+                if self.ffmpeg_available:
+                    output, mode, input_bytes, seconds = self._get_pool().submit(
+                        _convert_in_worker, str(file_path), self.target_extension
+                    ).result()
+                else:
+                    output, mode, input_bytes, seconds = str(self._rename(file_path)), 'renamed', 0, 0.0
+            except Exception as e:
+                timing['error'] = f"{type(e).__name__}: {e}"
+                UIHandler.print_error(f"Couldn't convert '{file_path.name}' to {self.target_extension}: {str(e)}")
+                with self._lock:
+                    self.counts['failed'] += 1
+                return file_path
+            timing['bytes'], timing['mode'] = input_bytes, mode
+
+        with self._lock:
+            self.counts[mode] += 1
+            self.input_bytes += input_bytes
+            self.busy_seconds += seconds
+            self._converted.add(Path(output))
+        return Path(output)
+
+    def _rename(self, file_path: Path) -> Path:
+        new_file = file_path.with_suffix(f".{self.target_extension}")
+        if new_file != file_path:
+            file_path.rename(new_file)
+        return new_file
+
+    def mark_converted(self, file_paths: Iterable[Path]):
+        """Leave files already converted elsewhere, e.g. by a download shard, out of convert_folder"""
+        with self._lock:
+            self._converted.update(file_paths)
+
+    def convert_folder(self, dir_path: Path) -> list[tuple[Path, Path]]:
+        """Convert every file in a folder not converted yet, in parallel, and return the (old, new) paths that changed"""
+        # Partial downloads and intermediate files aren't finished media; converting one would pass it off as done
+        files = [file for file in dir_path.iterdir()
+                 if file.is_file() and file not in self._converted and not is_temporary(file)]
+        results = []
+        if files:
+            # Threads only wait on the process pool; they keep every process busy
+            with ThreadPoolExecutor(max_workers=self.max_workers) as waiters:
+                results = list(waiters.map(self.convert, files))
+        return [(old, new) for old, new in zip(files, results) if old != new]
+
+    def print_summary(self):
+        """Report how many files took each path and the overall throughput"""
+        converted = sum(self.counts.values())
+        if not converted:
+            return
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        parts = ', '.join(f"{count} {mode}" for mode, count in self.counts.items() if count)
+        UIHandler.print_info(f"Converted {converted} files to {self.target_extension}: {parts}")
+        if elapsed > 0 and self.input_bytes:
+            UIHandler.print_info(
+                f"Conversion throughput: {self.input_bytes / elapsed / (1024 * 1024):.1f} MB/s "
+                f"({self.busy_seconds:.1f}s of ffmpeg work in {elapsed:.1f}s)"
+            )
+
+    def close(self):
+        """Shut down the worker processes"""
+        with self._lock:
+            if self._pool is not None and self._owns_pool:
+                self._pool.shutdown()
+            self._pool = None
\ No newline at end of file
@@ -1,4 +1,4 @@
-from config import FileType, VALID_VIDEO_FILE_TYPES, VALID_AUDIO_FILE_TYPES, AVAILABLE_RESOLUTIONS
+from config import FileType, VALID_VIDEO_FILE_TYPES, VALID_AUDIO_FILE_TYPES, AVAILABLE_RESOLUTIONS, MAX_PARALLEL_DOWNLOADS
 
 class UIHandler:
     @staticmethod
@@ -106,6 +106,27 @@ class UIHandler:
             except ValueError:
                 UIHandler.print_error(f"Please enter a valid number between 1 and {len(AVAILABLE_RESOLUTIONS)}")
 
+    @staticmethod
+    def get_worker_count() -> int:
+        """Get number of videos to download in parallel from user"""
+        UIHandler.print_section_header("PARALLEL DOWNLOADS")
+        print(f"⚡ How many videos should be downloaded at once? (1-{MAX_PARALLEL_DOWNLOADS})")
+
+        while True:
+            choice = input("Enter a number, or press Enter for 1: ").strip()
+            if not choice:
+                UIHandler.print_info("Videos will be downloaded one at a time")
+                return 1
+            try:
+                workers = int(choice)
+                if 1 <= workers <= MAX_PARALLEL_DOWNLOADS:
+                    UIHandler.print_success(f"{workers} parallel download(s) selected")
+                    return workers
+                else:
+                    UIHandler.print_error(f"Please enter a number between 1 and {MAX_PARALLEL_DOWNLOADS}")
+            except ValueError:
+                UIHandler.print_error(f"Please enter a valid number between 1 and {MAX_PARALLEL_DOWNLOADS}")
+
     @staticmethod
     def get_zip_preference() -> bool:
         """Get user preference for ZIP compression"""
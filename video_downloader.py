@@ -1,83 +1,460 @@
-from pytubefix import YouTube
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TYPE_CHECKING
+from urllib.error import HTTPError
 from pathlib import Path
-from tqdm import tqdm
 from config import FileType
 from stream_handler import StreamHandler
+from merge_pipeline import MergePipeline
+from download_manifest import DownloadManifest
+from stream_fetcher import StreamFetcher
+from metadata_cache import MetadataCache
+from file_manager import StreamingZipArchive
+from transcoder import StreamEncodeError, Transcoder, encode_stream, stream_audio_codec, stream_video_codec
 from ui_handler import UIHandler
+from metrics import Metrics
+from bandwidth_limiter import BandwidthLimiter
+from storage_planner import StoragePlanner
+from media_store import MediaStore
+from download_plan import PlannedStream, PlannedVideo, is_executable, plan_entry, planned_streams
+
+# pytubefix, tqdm and ffmpeg take most of the startup time, so they are imported where first used
+if TYPE_CHECKING:
+    from pytubefix import YouTube
+    from tqdm import tqdm
 
 class VideoDownloader:
+    BAR_FORMAT = '{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]'
+    # Streams smaller than this aren't worth splitting across connections
+    MIN_SEGMENTED_SIZE = 16 * 1024 * 1024
+    # Partial files being written by any downloader in this process, so two never share one
+    _partials_in_use: set[Path] = set()
+    _partials_lock = threading.Lock()
+
     def __init__(self):
-        self.progress_bar: tqdm | None = None
+        # One progress bar per in-flight stream so concurrent downloads don't share a bar
+        self.progress_bars: dict[int, 'tqdm'] = {}
+        self._progress_lock = threading.Lock()
+        # When set, adaptive merges are handed off instead of blocking the download
+        self.merge_pipeline: MergePipeline | None = None
+        # When set, finished outputs are recorded and skipped on later runs
+        self.manifest: DownloadManifest | None = None
+        # Keep .part files of interrupted streams and continue them with range requests
+        self.resume_downloads: bool = False
+        # With resume_downloads, partial streams are kept here by video ID and itag, so later runs find them
+        self.partial_dir: Path | None = None
+        # Split large streams across this many connections
+        self.download_segments: int = 1
+        # Reuse resolved YouTube objects and player responses across calls
+        self.metadata_cache: MetadataCache | None = None
+        # When set, each finished file is moved into this ZIP right away
+        self.archive: StreamingZipArchive | None = None
+        # When set, each finished file is converted to the target format right away
+        self.transcoder: Transcoder | None = None
+        # Shared cap on transfer speed, enforced per received chunk
+        self.bandwidth_limiter: BandwidthLimiter | None = None
+        # When set, downloads wait for or are refused disk space up front
+        self.storage_planner: StoragePlanner | None = None
+        # Pipe audio-only downloads straight into ffmpeg instead of saving the source first
+        self.stream_audio: bool = False
+        # When set, finished files are kept once in this store and linked into run folders
+        self.media_store: MediaStore | None = None
+        # Final output of every video finished in this run, by video ID
+        self.outputs: dict[str, Path] = {}
+        # Skip videos published before this date
+        self.published_after: date | None = None
+        # How each thread's last download ended, for retry and cutoff decisions
+        self._outcome = threading.local()
 
     def progress_hook(self, stream, chunk, bytes_remaining):
         """Progress hook for download progress bar"""
-        if self.progress_bar is not None:
-            self.progress_bar.update(len(chunk))
+        self._advance(stream, len(chunk))
+
+    def _advance(self, stream, byte_count: int):
+        """Move the progress bar of a stream forward for bytes just received, then wait for bandwidth if limited"""
+        self._show_progress(stream, byte_count)
+        if self.bandwidth_limiter is not None:
+            self.bandwidth_limiter.consume(byte_count)
+
+    def _show_progress(self, stream, byte_count: int):
+        """Move the progress bar of a stream forward without charging the bandwidth limit"""
+        progress_bar = self.progress_bars.get(id(stream))
+        if progress_bar is not None:
+            progress_bar.update(byte_count)
+
+    @contextmanager
+    def _progress_bar(self, stream, desc: str):
+        """Show a progress bar for a stream while the block transfers it"""
+        from tqdm import tqdm
+        progress_bar = tqdm(
+            total=stream.filesize,
+            unit='B',
+            unit_scale=True,
+            desc=desc,
+            bar_format=self.BAR_FORMAT
+        )
+        with self._progress_lock:
+            self.progress_bars[id(stream)] = progress_bar
+        try:
+            yield progress_bar
+        finally:
+            with self._progress_lock:
+                self.progress_bars.pop(id(stream), None)
+            progress_bar.close()
+
+    def _download_stream(self, stream, dir_path: Path, filename: str | None = None, desc: str = "Downloading",
+                         video_id: str | None = None) -> Path:
+        """Download a single stream with its own progress bar; video_id defaults to the thread's current video"""
+        with self._progress_bar(stream, desc):
+            with Metrics.phase("transfer", bytes=stream.filesize, itag=stream.itag):
+                if self._use_direct_fetch(stream):
+                    file_path = self._fetch_direct(stream, dir_path, filename, video_id)
+                else:
+                    file_path = stream.download(output_path=str(dir_path), filename=filename)
+        return Path(file_path)
+
+    def _use_audio_streaming(self, stream) -> bool:
+        """Whether an audio stream can be piped straight into ffmpeg"""
+        return (self.stream_audio and self.transcoder is not None and self.transcoder.ffmpeg_available
+                and bool(stream.filesize) and not stream.is_sabr)
+
+    def _stream_audio(self, stream, dir_path: Path, target_extension: str) -> Path:
+        """Download an audio stream through ffmpeg, writing only the converted file"""
+        output_path = Path(stream.get_file_path(output_path=str(dir_path))).with_suffix(f".{target_extension}")
+        chunks = StreamFetcher.iter_stream(
+            stream.url, stream.filesize, lambda byte_count: self._advance(stream, byte_count)
+        )
+        with self._progress_bar(stream, "Audio"):
+            with Metrics.phase("transfer", bytes=stream.filesize, itag=stream.itag, streamed=True):
+                return encode_stream(chunks, stream_audio_codec(stream.audio_codec), output_path)
+
+    def _use_direct_fetch(self, stream) -> bool:
+        """Whether a stream should bypass stream.download and go through StreamFetcher"""
+        if not stream.filesize or stream.is_sabr:
+            return False
+        # Planned streams are only a URL and a size
+        if isinstance(stream, PlannedStream):
+            return True
+        # pytubefix hands over whole 9 MB ranges, too coarse to throttle smoothly
+        if self.bandwidth_limiter is not None and self.bandwidth_limiter.rate > 0:
+            return True
+        return self.resume_downloads or (
+            self.download_segments > 1 and stream.filesize >= self.MIN_SEGMENTED_SIZE
+        )
+
+    def _fetch_direct(self, stream, dir_path: Path, filename: str | None, video_id: str | None = None) -> Path:
+        """Download a stream through StreamFetcher, segmented or resumable depending on settings"""
+        output_path = Path(stream.get_file_path(filename=filename, output_path=str(dir_path)))
+        if output_path.is_file() and output_path.stat().st_size == stream.filesize:
+            return output_path
+
+        on_progress = lambda byte_count: self._advance(stream, byte_count)
+        if self.download_segments > 1 and stream.filesize >= self.MIN_SEGMENTED_SIZE:
+            return StreamFetcher.fetch_segmented(
+                stream.url, output_path, stream.filesize, self.download_segments, on_progress
+            )
+        part_path = self._claim_partial(stream, video_id or Metrics.current_video())
+        try:
+            return StreamFetcher.fetch_resumable(
+                stream.url, output_path, stream.filesize, str(stream.itag), on_progress, part_path=part_path,
+                # Bytes already on disk move the bar but were never transferred, so they don't count against the limit
+                on_resume=lambda byte_count: self._show_progress(stream, byte_count)
+            )
+        finally:
+            if part_path is not None:
+                with self._partials_lock:
+                    self._partials_in_use.discard(part_path)
+
+    def _claim_partial(self, stream, video_id: str | None) -> Path | None:
+        """The stable partial file for a video's stream, or None to keep it in the run folder"""
+        if not self.resume_downloads or self.partial_dir is None or video_id is None:
+            return None
+        part_path = self.partial_dir / f"{video_id}.{stream.itag}.part"
+        with self._partials_lock:
+            if part_path in self._partials_in_use:
+                return None
+            self._partials_in_use.add(part_path)
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+        return part_path
+
+    def _resolve(self, url: str, video_id: str | None) -> 'YouTube':
+        """Build the YouTube object for url, through the metadata cache when one is set"""
+        if self.metadata_cache is not None:
+            return self.metadata_cache.resolve(url, video_id, self.progress_hook)
+        from pytubefix import YouTube
+        return YouTube(url, on_progress_callback=self.progress_hook)
+
+    def _persist_metadata(self, video_id: str | None, yt: 'YouTube'):
+        """Save extracted metadata to the on-disk cache, without failing the download if that breaks"""
+        if self.metadata_cache is None:
+            return
+        try:
+            self.metadata_cache.persist(video_id, yt)
+        except (OSError, TypeError, ValueError) as e:
+            UIHandler.print_error(f"Couldn't cache metadata for {video_id}: {str(e)}")
+
+    def last_failure(self) -> BaseException | None:
+        """The exception that failed this thread's last download_single call, if any"""
+        return getattr(self._outcome, 'error', None)
+
+    def last_was_too_old(self) -> bool:
+        """Whether this thread's last download_single call skipped a video older than published_after"""
+        return getattr(self._outcome, 'too_old', False)
+
+    @staticmethod
+    def get_video_id(url: str) -> str | None:
+        """Extract the video ID from a URL without any network access"""
+        from pytubefix import extract
+        from pytubefix.exceptions import RegexMatchError
+        try:
+            return extract.video_id(url)
+        except RegexMatchError:
+            return None
+
+    def _is_too_old(self, yt: 'YouTube') -> bool:
+        """Whether yt falls before the published_after cutoff"""
+        if self.published_after is None or yt.publish_date is None:
+            return False
+        return yt.publish_date.date() < self.published_after
+
+    def _completion_handler(self, key: str | None, video_id: str | None, itag: int | None,
+                            store_format: str | None = None) -> Callable[[Path], None] | None:
+        """Return a callback that converts a finished output, stores it, records it in the manifest and archives it"""
+        record = self.manifest is not None and key is not None
+        if (not record and video_id is None and self.archive is None and self.transcoder is None
+                and self.storage_planner is None):
+            return None
+
+        def on_complete(output_path: Path):
+            if self.transcoder is not None:
+                output_path = self.transcoder.convert(output_path)
+            if store_format is not None:
+                try:
+                    self.media_store.add(video_id, store_format, output_path)
+                except OSError as e:
+                    UIHandler.print_error(f"Couldn't add '{output_path.name}' to the media store: {str(e)}")
+            if video_id is not None:
+                self.outputs[video_id] = output_path
+            if self.storage_planner is not None:
+                self.storage_planner.record_output(output_path)
+            if record:
+                self.manifest.record(key, video_id, itag, output_path)
+            if self.archive is not None:
+                self.archive.add(output_path)
+
+        return on_complete
+
+    def _link_stored(self, video_id: str, store_format: str, dir_path: Path) -> bool:
+        """Link a video already in the media store into dir_path instead of downloading it"""
+        stored_path = self.media_store.lookup(video_id, store_format)
+        if stored_path is None:
+            return False
+        output_path = self.media_store.link_into(stored_path, dir_path)
+        self.outputs[video_id] = output_path
+        if self.archive is not None:
+            self.archive.add(output_path)
+        UIHandler.print_info(f"'{output_path.stem}' is already in the media store, linked instead of downloaded")
+        return True
+
+    def _reserve_storage(self, streams: list, target_extension: str, streamed: bool = False):
+        """Reserve the disk space a download will peak at, or do nothing without a storage planner"""
+        if self.storage_planner is None:
+            return nullcontext()
+        converts = not streamed and len(streams) == 1 and streams[0].subtype != target_extension
+        need = StoragePlanner.estimate(streams, converts, self.archive is not None)
+        return self.storage_planner.reserve(need)
 
     def download_single(self, url: str, file_type: FileType, target_extension: str, 
                        resolution: str, dir_path: Path) -> bool:
         """Download a single video from URL"""
+        video_id = self.get_video_id(url)
+        self._outcome.error = None
+        self._outcome.too_old = False
+        with Metrics.video(video_id, url) as outcome:
+            outcome['ok'] = self._download_single(url, video_id, file_type, target_extension, resolution, dir_path)
+            return outcome['ok']
+
+    def _download_single(self, url: str, video_id: str | None, file_type: FileType, target_extension: str,
+                         resolution: str, dir_path: Path) -> bool:
         try:
-            yt = YouTube(url, on_progress_callback=self.progress_hook)
+            done, manifest_key, store_format = self._skip_existing(video_id, file_type, target_extension, resolution, dir_path)
+            if done:
+                return True
+
+            with Metrics.phase("metadata"):
+                yt = self._resolve(url, video_id)
+                title = yt.title
             
+            if self._is_too_old(yt):
+                self._outcome.too_old = True
+                UIHandler.print_info(f"'{title}' was published before {self.published_after}, skipping")
+                return True
+
             # Display video info
-            print(f"\n📹 Title: {yt.title}")
+            print(f"\n📹 Title: {title}")
             print(f"👤 Author: {yt.author}")
             print(f"⏱️ Duration: {yt.length // 60}:{yt.length % 60:02d}")
             print(f"👀 Views: {yt.views:,}")
             
-            if file_type == FileType.VIDEO:
-                video_stream, audio_stream = StreamHandler.get_stream(yt, file_type, target_extension, resolution)
-                
-                if video_stream is None:
-                    UIHandler.print_error(f"No suitable video stream found for '{yt.title}'. Skipping download.")
-                    return False
-                
-                # Handle progressive stream (video + audio combined)
-                if audio_stream is None:
-                    return self._download_progressive(yt, video_stream, dir_path)
-                else:
-                    return self._download_adaptive(yt, video_stream, audio_stream, target_extension, dir_path)
-            
-            else:  # Audio only
-                audio_stream, _ = StreamHandler.get_stream(yt, file_type, target_extension)
-                if audio_stream is None:
-                    UIHandler.print_error(f"No suitable audio stream found for '{yt.title}'. Skipping download.")
-                    return False
-                
-                return self._download_audio(yt, audio_stream, dir_path)
+            stream, audio_stream = StreamHandler.get_stream(yt, file_type, target_extension, resolution)
+            if stream is None:
+                kind = "video" if file_type == FileType.VIDEO else "audio"
+                Metrics.record_failure(f"No suitable {kind} stream")
+                UIHandler.print_error(f"No suitable {kind} stream found for '{yt.title}'. Skipping download.")
+                return False
+
+            self._persist_metadata(video_id, yt)
+            success = self._fetch_streams(yt, video_id, stream, audio_stream, file_type, target_extension,
+                                          dir_path, manifest_key, store_format)
+
+            if not success and self.metadata_cache is not None:
+                # Stream URLs may have expired; make a retry extract them again
+                self.metadata_cache.invalidate(video_id)
+            return success
                 
         except Exception as e:
+            if self.metadata_cache is not None:
+                self.metadata_cache.invalidate(video_id)
+            self._outcome.error = e
+            Metrics.record_failure(f"{type(e).__name__}: {e}")
             UIHandler.print_error(f"Error processing video: {str(e)}")
             return False
 
-    def _download_progressive(self, yt: YouTube, stream, dir_path: Path) -> bool:
+    def existing_copy(self, video_id: str | None, file_type: FileType, target_extension: str, resolution: str) -> str | None:
+        """Where a finished copy of the video already is ('media store' or 'manifest'), without linking it"""
+        if video_id is None:
+            return None
+        if self.media_store is not None and self.media_store.lookup(
+                video_id, MediaStore.format_name(file_type, target_extension, resolution)) is not None:
+            return 'media store'
+        if self.manifest is not None and self.manifest.lookup(
+                DownloadManifest.make_key(video_id, file_type, target_extension, resolution)) is not None:
+            return 'manifest'
+        return None
+
+    def _skip_existing(self, video_id: str | None, file_type: FileType, target_extension: str, resolution: str,
+                       dir_path: Path) -> tuple[bool, str | None, str | None]:
+        """Link a video the media store holds or skip one the manifest has, before touching the network.
+
+        Returns (already done, manifest key, media store format) for recording the download.
+        """
+        store_format = None
+        if self.media_store is not None and video_id is not None:
+            store_format = MediaStore.format_name(file_type, target_extension, resolution)
+            if self._link_stored(video_id, store_format, dir_path):
+                return True, None, store_format
+
+        manifest_key = None
+        if self.manifest is not None and video_id is not None:
+            manifest_key = DownloadManifest.make_key(video_id, file_type, target_extension, resolution)
+            entry = self.manifest.lookup(manifest_key)
+            if entry is not None:
+                output_path = self.manifest.output_path(entry)
+                if output_path is not None:
+                    self.outputs[video_id] = output_path
+                UIHandler.print_info(f"Video {video_id} already downloaded, skipping")
+                return True, manifest_key, store_format
+        return False, manifest_key, store_format
+
+    def _fetch_streams(self, yt, video_id: str | None, stream, audio_stream, file_type: FileType, target_extension: str,
+                       dir_path: Path, manifest_key: str | None, store_format: str | None) -> bool:
+        """Download the selected streams and hand the result to the completion handler"""
+        on_complete = self._completion_handler(manifest_key, video_id, stream.itag, store_format)
+        if file_type == FileType.AUDIO:
+            streamed = self._use_audio_streaming(stream)
+            with self._reserve_storage([stream], target_extension, streamed):
+                return self._download_audio(yt, stream, target_extension, dir_path, on_complete)
+
+        # Handle progressive stream (video + audio combined)
+        if audio_stream is None:
+            with self._reserve_storage([stream], target_extension):
+                return self._download_progressive(yt, stream, dir_path, on_complete)
+        # Queued merges release their share once downloaded; their temp files still show in free space
+        with self._reserve_storage([stream, audio_stream], target_extension):
+            return self._download_adaptive(yt, stream, audio_stream, target_extension, dir_path, on_complete)
+
+    def plan_single(self, url: str, file_type: FileType, target_extension: str, resolution: str) -> dict | None:
+        """Resolve a video and describe what downloading it would fetch, without transferring any media"""
+        video_id = self.get_video_id(url)
+        self._outcome.error = None
+        self._outcome.too_old = False
+        try:
+            with Metrics.phase("metadata"):
+                yt = self._resolve(url, video_id)
+                title = yt.title
+            if self._is_too_old(yt):
+                self._outcome.too_old = True
+                return None
+
+            stream, audio_stream = StreamHandler.get_stream(yt, file_type, target_extension, resolution)
+            if stream is None:
+                UIHandler.print_error(f"No suitable stream found for '{title}'")
+                return None
+            self._persist_metadata(video_id, yt)
+            return plan_entry(yt, video_id, url, stream, audio_stream, file_type, target_extension, resolution)
+        except Exception as e:
+            if self.metadata_cache is not None:
+                self.metadata_cache.invalidate(video_id)
+            self._outcome.error = e
+            UIHandler.print_error(f"Error resolving {url}: {str(e)}")
+            return None
+
+    def download_planned(self, entry: dict, dir_path: Path) -> bool:
+        """Download a video from a plan entry by its stored stream URLs, resolving it again only if they expired"""
+        file_type = FileType[entry['file_type'].upper()]
+        self._outcome.error = None
+        self._outcome.too_old = False
+        if is_executable(entry):
+            with Metrics.video(entry['video_id'], entry['url']) as outcome:
+                outcome['ok'] = self._download_planned(entry, file_type, dir_path)
+            error = self.last_failure()
+            if outcome['ok'] or not (isinstance(error, HTTPError) and error.code in (403, 404, 410)):
+                return outcome['ok']
+            UIHandler.print_info(f"Planned stream URL for '{entry['title']}' was refused, resolving it again")
+        return self.download_single(entry['url'], file_type, entry['extension'], entry['resolution'], dir_path)
+
+    def _download_planned(self, entry: dict, file_type: FileType, dir_path: Path) -> bool:
+        video_id = entry['video_id']
+        try:
+            done, manifest_key, store_format = self._skip_existing(
+                video_id, file_type, entry['extension'], entry['resolution'], dir_path
+            )
+            if done:
+                return True
+            yt = PlannedVideo(entry)
+            print(f"\n📹 Title: {yt.title} (planned)")
+            stream, audio_stream = planned_streams(entry)
+            return self._fetch_streams(yt, video_id, stream, audio_stream, file_type, entry['extension'],
+                                       dir_path, manifest_key, store_format)
+        except Exception as e:
+            self._outcome.error = e
+            Metrics.record_failure(f"{type(e).__name__}: {e}")
+            UIHandler.print_error(f"Error processing video: {str(e)}")
+            return False
+
+    def _download_progressive(self, yt: 'YouTube', stream, dir_path: Path,
+                              on_complete: Callable[[Path], None] | None = None) -> bool:
         """Download progressive stream (video + audio combined)"""
         try:
             file_size = stream.filesize
             print(f"📦 File size: {file_size / (1024*1024):.1f} MB")
             print(f"🎯 Quality: {stream.resolution}")
-            
-            self.progress_bar = tqdm(
-                total=file_size,
-                unit='B',
-                unit_scale=True,
-                desc="Downloading",
-                bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]'
-            )
 
-            stream.download(output_path=str(dir_path))
-            self.progress_bar.close()
+            output_path = self._download_stream(stream, dir_path)
+            if on_complete is not None:
+                on_complete(output_path)
             UIHandler.print_success(f"'{yt.title}' downloaded successfully!")
             return True
             
         except Exception as e:
-            if self.progress_bar is not None:
-                self.progress_bar.close()
+            self._outcome.error = e
             UIHandler.print_error(f"Failed to download '{yt.title}': {str(e)}")
             return False
 
-    def _download_adaptive(self, yt: YouTube, video_stream, audio_stream, target_extension: str, dir_path: Path) -> bool:
+    def _download_adaptive(self, yt: 'YouTube', video_stream, audio_stream, target_extension: str, dir_path: Path,
+                           on_complete: Callable[[Path], None] | None = None) -> bool:
         """Download adaptive streams (separate video and audio)"""
         try:
             total_size = video_stream.filesize + audio_stream.filesize
@@ -85,42 +462,39 @@ class VideoDownloader:
             print(f"🎯 Video quality: {video_stream.resolution}")
             print(f"🎵 Audio quality: {audio_stream.abr}")
             
-            # Download video
-            print("Downloading video stream...")
-            self.progress_bar = tqdm(
-                total=video_stream.filesize,
-                unit='B',
-                unit_scale=True,
-                desc="Video",
-                bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]'
-            )
-            
+            # Download video and audio at the same time, each with its own progress bar.
+            # Leaving the executor block waits for both, so the merge never sees a partial file.
+            print("Downloading video and audio streams...")
             video_filename = f"{yt.title}_video_temp.{video_stream.subtype}"
-            video_path = dir_path / video_filename
-            video_stream.download(output_path=str(dir_path), filename=video_filename)
-            self.progress_bar.close()
-            
-            # Download audio
-            print("Downloading audio stream...")
-            self.progress_bar = tqdm(
-                total=audio_stream.filesize,
-                unit='B',
-                unit_scale=True,
-                desc="Audio",
-                bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]'
-            )
-            
             audio_filename = f"{yt.title}_audio_temp.{audio_stream.subtype}"
-            audio_path = dir_path / audio_filename
-            audio_stream.download(output_path=str(dir_path), filename=audio_filename)
-            self.progress_bar.close()
+            # The executor threads don't know which video they work on, so it is handed to them
+            video_id = Metrics.current_video()
+
+            def fetch(stream, filename: str, desc: str) -> Path:
+                with Metrics.bind(video_id):
+                    return self._download_stream(stream, dir_path, filename, desc, video_id)
+
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                video_future = executor.submit(fetch, video_stream, video_filename, "Video")
+                audio_future = executor.submit(fetch, audio_stream, audio_filename, "Audio")
+            video_path = video_future.result()
+            audio_path = audio_future.result()
             
             # Merge video and audio
-            print("Merging video and audio...")
             output_filename = f"{yt.title}.{target_extension}"
             output_path = dir_path / output_filename
-            
-            if StreamHandler.merge_video_audio(video_path, audio_path, output_path, yt.length):
+            # Codecs from the stream listing spare ffprobe runs when planning the merge
+            codecs = (stream_video_codec(video_stream.video_codec), stream_audio_codec(audio_stream.audio_codec))
+
+            if self.merge_pipeline is not None:
+                self.merge_pipeline.submit(yt.title, video_path, audio_path, output_path, yt.length, on_complete, codecs)
+                UIHandler.print_info(f"'{yt.title}' downloaded, queued for merging")
+                return True
+
+            print("Merging video and audio...")
+            if StreamHandler.merge_video_audio(video_path, audio_path, output_path, yt.length, *codecs):
+                if on_complete is not None:
+                    on_complete(output_path)
                 UIHandler.print_success(f"'{yt.title}' downloaded and merged successfully!")
                 return True
             else:
@@ -128,33 +502,35 @@ class VideoDownloader:
                 return False
                 
         except Exception as e:
-            if self.progress_bar is not None:
-                self.progress_bar.close()
+            self._outcome.error = e
+            # The transfer failed on an executor thread, whose recorded reason this thread can't see
+            Metrics.record_failure(f"{type(e).__name__}: {e}")
             UIHandler.print_error(f"Failed to download '{yt.title}': {str(e)}")
             return False
 
-    def _download_audio(self, yt: YouTube, stream, dir_path: Path) -> bool:
+    def _download_audio(self, yt: 'YouTube', stream, target_extension: str, dir_path: Path,
+                        on_complete: Callable[[Path], None] | None = None) -> bool:
         """Download audio-only stream"""
         try:
             file_size = stream.filesize
             print(f"📦 File size: {file_size / (1024*1024):.1f} MB")
             print(f"🎵 Audio quality: {stream.abr}")
-            
-            self.progress_bar = tqdm(
-                total=file_size,
-                unit='B',
-                unit_scale=True,
-                desc="Downloading",
-                bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]'
-            )
 
-            stream.download(output_path=str(dir_path))
-            self.progress_bar.close()
+            output_path = None
+            if self._use_audio_streaming(stream):
+                try:
+                    output_path = self._stream_audio(stream, dir_path, target_extension)
+                except StreamEncodeError as e:
+                    # Some containers can't be demuxed from a pipe; fetch the file instead
+                    UIHandler.print_info(f"Streaming conversion failed ({str(e)}), downloading the file instead")
+            if output_path is None:
+                output_path = self._download_stream(stream, dir_path)
+            if on_complete is not None:
+                on_complete(output_path)
             UIHandler.print_success(f"'{yt.title}' downloaded successfully!")
             return True
             
         except Exception as e:
-            if self.progress_bar is not None:
-                self.progress_bar.close()
+            self._outcome.error = e
             UIHandler.print_error(f"Failed to download '{yt.title}': {str(e)}")
             return False
\ No newline at end of file